@@ -38,7 +38,10 @@ Catframes
 # from __future__ import annotations  # для псевдонимов в autodoc
 
 from argparse import ArgumentParser, ArgumentTypeError, RawDescriptionHelpFormatter
-from datetime import datetime
+import contextlib
+from datetime import datetime, timedelta, timezone
+import errno
+import fnmatch
 import functools
 import gc
 import hashlib
@@ -48,7 +51,7 @@ import json
 import math
 import os
 from operator import itemgetter
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 import platform
 import random
 import re
@@ -56,23 +59,28 @@ import shutil
 import signal
 import subprocess
 import sys
+import tarfile
 import tempfile
 import threading
 from _thread import interrupt_main
 import textwrap
+import zipfile
+import zlib
 from queue import Queue, Empty, Full
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, \
+    Sequence, Set, Tuple, Union
 
 import base64
 from time import sleep, monotonic
-from unittest import TestCase
+from unittest import TestCase, skipUnless
 
-from PIL import Image, ImageColor, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont, JpegImagePlugin
 
 if 'Windows' == platform.system():
     import ctypes
@@ -102,17 +110,46 @@ class FileUtils:
         """This function does not throw exceptions."""
         if not path:
             return None
-        hashsum = hashlib.sha1()
         try:
             with path.expanduser().open(mode = 'rb') as binary:
-                chunk = binary.read(4096)
-                while chunk:
-                    hashsum.update(chunk)
-                    chunk = binary.read(4096)
-            return hashsum.hexdigest()
+                return FileUtils.get_stream_checksum(binary)
         except OSError:
             return None
 
+    @staticmethod
+    def get_stream_checksum(binary: BinaryIO) -> str:
+        """Читает поток до конца.
+
+        :raises OSError: ошибка чтения.
+        """
+        hashsum = hashlib.sha1()
+        chunk = binary.read(4096)
+        while chunk:
+            hashsum.update(chunk)
+            chunk = binary.read(4096)
+        return hashsum.hexdigest()
+
+    EXIF_IFD_TAG = 0x8769
+    EXIF_DATETIME_ORIGINAL_TAG = 0x9003
+
+    @staticmethod
+    def get_exif_time(image: Image.Image) -> Optional[datetime]:
+        """Время съёмки (DateTimeOriginal) из EXIF открытой, но не декодированной картинки.
+        Пиксели не читаются: если EXIF нет в заголовке файла, время считается неизвестным.
+        This function does not throw exceptions.
+        """
+        if ('exif' not in image.info) and (image.format != 'TIFF'):
+            return None
+        try:
+            exif_ifd = image.getexif().get_ifd(FileUtils.EXIF_IFD_TAG)
+            value = exif_ifd.get(FileUtils.EXIF_DATETIME_ORIGINAL_TAG)
+            if not isinstance(value, str):
+                return None
+            return datetime.strptime(value.strip('\x00 '), '%Y:%m:%d %H:%M:%S')
+        except Exception:
+            # Битый EXIF — обычное дело, а разборщик Pillow может выбросить что угодно.
+            return None
+
     @staticmethod
     def get_mtime(path: Union[Path, None]) -> Optional[datetime]:
         """This function does not throw exceptions."""
@@ -155,19 +192,38 @@ class FileUtils:
             pass
         return '\n'.join([x.rstrip() for x in result])
 
-    @staticmethod
-    def list_images(path: Path) -> List[Path]:
-        """Набор файлов JPEG и PNG в порядке, предоставляемом pathlib (не определён в документации
-        и, скорее всего, зависит от операционной системы). Файлы определяются по расширениям
-        (суффиксам имён). Вложенные папки игнорируются.
+    FRAME_EXTENSIONS = "jpg", "jpeg", "png", "qoi", "pcx"
+
+    @classmethod
+    def list_images(cls, path: Path) -> List[Path]:
+        """Набор файлов JPEG и PNG в порядке, предоставляемом операционной системой. Файлы
+        определяются по расширениям (суффиксам имён). Вложенные папки игнорируются.
 
         :raises ValueError: путь – не директория, доступная на просмотр (подробности в сообщении).
         :raises OSError: что-то, что не было предусмотрено.
         """
-        folder = path.expanduser()
+        return [Path(entry.path) for entry in cls.scan_images(path)]
 
-        frame_extensions = "jpg", "jpeg", "png", "qoi", "pcx"
+    @classmethod
+    def scan_images(cls, path: Path) -> List[os.DirEntry]:
+        """То же, что :meth:`list_images`, но возвращает элементы :func:`os.scandir`, чтобы
+        не запрашивать повторно то, что уже известно о файлах после просмотра папки.
+
+        :raises ValueError: путь – не директория, доступная на просмотр (подробности в сообщении).
+        :raises OSError: что-то, что не было предусмотрено.
+        """
+        return cls._scan_folder(path.expanduser(), False)[0]
+
+    @classmethod
+    def _scan_folder(cls, folder: Path, with_folders: bool) \
+            -> Tuple[List[os.DirEntry], List[os.DirEntry]]:
+        """Изображения и, если нужно, вложенные папки (не симлинки на них).
 
+        :raises ValueError: путь – не директория, доступная на просмотр (подробности в сообщении).
+        :raises OSError: что-то, что не было предусмотрено.
+        """
+        images = []
+        folders = []
         try:
             # Поскольку здесь мы не читаем файлы,
             # все ошибки будут свидетельствовать о проблеме с папкой.
@@ -178,26 +234,131 @@ class FileUtils:
             # получить список, но не удасться узнать что-либо о его элементах.
             # Если же файл будет удалён прямо перед вызовом is_file(),
             # этот метод согласно документации просто вернёт False.
-            return [
-                file_path
-                for file_path in folder.iterdir()
-                if file_path.is_file()
-                and file_path.suffix[1:].lower() in frame_extensions
-            ]
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    extension = os.path.splitext(entry.name)[1][1:].lower()
+                    if (extension in cls.FRAME_EXTENSIONS) and entry.is_file():
+                        images.append(entry)
+                    elif with_folders and entry.is_dir(follow_symlinks=False):
+                        folders.append(entry)
         except FileNotFoundError:
             raise ValueError(f'The path is not a folder: {folder}')
         except NotADirectoryError:
             raise ValueError(f'The path is not a folder: {folder}')
         except PermissionError:
             raise ValueError(f'Forbidden: {folder}')
+        return images, folders
+
+    @classmethod
+    def walk_images(cls, path: Path, include: Sequence[str] = (),
+            exclude: Sequence[str] = ()) -> List[Tuple[Path, List[os.DirEntry]]]:
+        """Рекурсивный :meth:`scan_images`. Папки просматриваются параллельно, симлинки на папки
+        не открываются. Возвращает только папки с изображениями (пути относительно ``path``)
+        в порядке, предоставляемом операционной системой.
+
+        Шаблоны (см. :mod:`fnmatch`) сравниваются с относительным путём в стиле POSIX и с
+        именем. Папки, подходящие под ``exclude``, не просматриваются вовсе. Если ``include``
+        не пуст, берутся только подходящие под него файлы. Недоступные вложенные папки
+        (``lost+found``, ``System Volume Information``) пропускаются с предупреждением.
+
+        :raises ValueError: сама папка ``path`` недоступна на просмотр (подробности в сообщении).
+        :raises OSError: что-то, что не было предусмотрено.
+        """
+        root = path.expanduser()
+
+        def matches(relative: PurePosixPath, patterns: Sequence[str]) -> bool:
+            return any(
+                fnmatch.fnmatch(str(relative), x) or fnmatch.fnmatch(relative.name, x)
+                for x in patterns)
+
+        def scan(relative: PurePosixPath):
+            try:
+                images, folders = cls._scan_folder(root / relative, True)
+            except ValueError as error:
+                if not relative.parts:
+                    raise
+                print(f'Warning: {error}, the folder is skipped.', flush=True)
+                return relative, [], []
+            images = [
+                x for x in images
+                if not matches(relative / x.name, exclude)
+                and (not include or matches(relative / x.name, include))
+            ]
+            folders = [relative / x.name for x in folders]
+            return relative, images, [x for x in folders if not matches(x, exclude)]
+
+        result = []
+        with ThreadPoolExecutor() as executor:
+            pending = {executor.submit(scan, PurePosixPath())}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    relative, images, folders = future.result()
+                    if images:
+                        result.append((Path(relative), images))
+                    pending.update(executor.submit(scan, x) for x in folders)
+        return result
+
+    @staticmethod
+    def read_file_list(binary: BinaryIO, chunk_size: int = 65536) \
+            -> Iterator[Tuple[Optional[str], Path]]:
+        """Читает по частям список путей, разделённых переводами строк или, если в начале списка
+        встретился нулевой байт, символами NUL. Возвращает пары из метки группы (то, что стоит
+        перед табуляцией, если она есть) и пути. Пустые строки пропускаются.
+
+        :raises OSError: ошибка чтения.
+        """
+        chunk = binary.read(chunk_size)
+        separator = b'\0' if b'\0' in chunk else b'\n'
+        tail = b''
+
+        def parse(items: List[bytes]) -> Iterator[Tuple[Optional[str], Path]]:
+            for item in items:
+                if separator == b'\n':
+                    item = item.rstrip(b'\r')
+                if not item:
+                    continue
+                if b'\t' in item:
+                    group, path = item.split(b'\t', 1)
+                    yield os.fsdecode(group), Path(os.fsdecode(path))
+                else:
+                    yield None, Path(os.fsdecode(item))
+
+        while chunk:
+            items = (tail + chunk).split(separator)
+            tail = items.pop()
+            yield from parse(items)
+            chunk = binary.read(chunk_size)
+        yield from parse([tail])
+
+    @staticmethod
+    def get_entry_inode(entry: os.DirEntry) -> int:
+        """Номер inode, уже полученный при просмотре папки, или ноль в Windows, где для него
+        понадобился бы отдельный системный вызов. This function does not throw exceptions.
+        """
+        if os.name != 'posix':
+            return 0
+        try:
+            return entry.inode()
+        except OSError:
+            return 0
+
+    @staticmethod
+    def get_entry_mtime(entry: os.DirEntry) -> Optional[datetime]:
+        """This function does not throw exceptions."""
+        try:
+            return datetime.fromtimestamp(entry.stat().st_mtime)
+        except OSError:
+            return None
 
     @staticmethod
-    def sort_natural(files: List[Path]):
+    def sort_natural(files: Union[List[Path], List[os.DirEntry]], by_parts: bool = False):
         """В Linux также известен как version sort. Многосимвольные десятичные числа считаются
         за один символ и сортируются в зависимости от значения числа.
 
         Функция сортирует файлы или симлинки по именам, игнорируя их местоположения. Список
-        сортируется на месте, чтобы экономить память.
+        сортируется на месте, чтобы экономить память. С ``by_parts`` сортируются
+        относительные пути: по очереди сравниваются имена всех уровней.
 
         Способ сортировки имён похож на используемый в команде sort из GNU Coreutils, если
         использовать её как ``echo СПИСОК | sort -Vs``, но не совпадает полностью.
@@ -205,8 +366,11 @@ class FileUtils:
         extension_pattern = re.compile(r'(\.[a-zA-Z0-9]+)+$')
         part_pattern = re.compile(r'(\D|\d+)')
 
+        def get_names(path) -> Sequence[str]:
+            return path.parts if by_parts else (path.name,)
+
         def get_max_integer(path: Path) -> int:
-            parts = part_pattern.findall(path.name)
+            parts = [x for name in get_names(path) for x in part_pattern.findall(name)]
             integers = [int(x) for x in parts if x.isdigit()]
             return max(integers) if integers else 0
 
@@ -222,8 +386,7 @@ class FileUtils:
                     result.append((level, max_int_value+1, ord(letter_or_number)))
             return result
 
-        def key_function(path):
-            filename = path.name
+        def name_key_function(filename: str):
             extension_match = extension_pattern.search(filename)
             if extension_match:
                 extension = extension_match[0]
@@ -236,7 +399,10 @@ class FileUtils:
             # базовая часть, тем раньше файл в последовательности.
             tuples = natural_simple(1, basename)
             tuples.extend(natural_simple(0, extension))
-            return functools.reduce(lambda x, y: x+y, tuples)
+            return functools.reduce(lambda x, y: x+y, tuples, ())
+
+        def key_function(path):
+            return tuple(name_key_function(x) for x in get_names(path))
 
         files.sort(key=key_function)
 
@@ -378,6 +544,82 @@ class _FileUtilsTest(TestCase):
         # on Unix-like systems
         pass # TODO
 
+    def test_walk_images(self):
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            root = Path(folder_path_string)
+            for relative in ('1.jpg', '2024/05/01/1.jpg', '2024/05/01/2.png', '2024/05/02/1.jpg',
+                    '2024/05/02/skip.jpg', '2024/05/empty/a.txt', 'trash/1.jpg'):
+                (root / relative).parent.mkdir(parents=True, exist_ok=True)
+                (root / relative).touch()
+
+            result = FileUtils.walk_images(root, exclude=['trash', 'skip.*'])
+            folders = {str(PurePosixPath(x)): sorted(y.name for y in z) for x, z in result}
+            self.assertEqual({
+                '.': ['1.jpg'],
+                '2024/05/01': ['1.jpg', '2.png'],
+                '2024/05/02': ['1.jpg'],
+            }, folders)
+
+            result = FileUtils.walk_images(root, include=['*.png'])
+            self.assertEqual([(Path('2024/05/01'), ['2.png'])],
+                [(x, [y.name for y in z]) for x, z in result])
+
+            with self.assertRaises(ValueError):
+                FileUtils.walk_images(root / 'fake')
+
+    def test_walk_forbidden_folder(self):
+        """Недоступная вложенная папка пропускается, недоступный корень — нет."""
+        class ForbiddingFileUtils(FileUtils):
+            @classmethod
+            def _scan_folder(cls, folder: Path, with_folders: bool):
+                if folder.name == 'lost+found':
+                    raise ValueError(f'Forbidden: {folder}')
+                return super()._scan_folder(folder, with_folders)
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            root = Path(folder_path_string)
+            for relative in '1.jpg', 'lost+found/1.jpg', 'day/1.jpg':
+                (root / relative).parent.mkdir(parents=True, exist_ok=True)
+                (root / relative).touch()
+
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                result = ForbiddingFileUtils.walk_images(root)
+            self.assertIn('lost+found', output.getvalue())
+            self.assertEqual(['.', 'day'], sorted(str(PurePosixPath(x)) for x, _ in result))
+
+            with self.assertRaises(ValueError):
+                ForbiddingFileUtils.walk_images(root / 'lost+found')
+
+    def test_natural_sort_by_parts(self):
+        """Сравниваются все уровни пути, и более короткий путь идёт раньше."""
+        expected = [
+            Path('.'),
+            Path('2024', '5', '9'),
+            Path('2024', '5', '10'),
+            Path('2024', '5', '10', '1'),
+            Path('2024', '10', '1'),
+            Path('2024_old'),
+        ]
+
+        items = expected.copy()
+        random.shuffle(items)
+
+        FileUtils.sort_natural(items, by_parts=True)
+        self.assertSequenceEqual(expected, items)
+
+    def test_read_file_list(self):
+        binary = io.BytesIO(b'a/1.jpg\r\na/2.jpg\n\nday 1\tb/1.jpg\nb/2.jpg')
+        self.assertEqual([
+            (None, Path('a/1.jpg')),
+            (None, Path('a/2.jpg')),
+            ('day 1', Path('b/1.jpg')),
+            (None, Path('b/2.jpg')),
+        ], list(FileUtils.read_file_list(binary, chunk_size=5)))
+
+        binary = io.BytesIO(b'a\n1.jpg\0a/2.jpg\0')
+        self.assertEqual([(None, Path('a\n1.jpg')), (None, Path('a/2.jpg'))],
+            list(FileUtils.read_file_list(binary)))
+
     def test_natural_sort_of_empty_list(self):
         """It must not crash when sorting empty file lists."""
         items = []
@@ -467,6 +709,408 @@ class _FileUtilsTest(TestCase):
         self.assertSequenceEqual(expected, items)
 
 
+class FrameSource(ABC):
+    """Архив с кадрами. Изображения читаются прямо из членов архива, без распаковки на диск.
+    Обычные папки сюда не относятся: их кадры адресуются настоящими путями (см. :class:`FileUtils`).
+
+    Имена членов архива — пути в стиле POSIX. Методы можно вызывать из разных потоков.
+
+    :raises ValueError: архив не читается (подробности в сообщении).
+    """
+    ZIP_SUFFIXES = '.zip',
+    TAR_SUFFIXES = '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz', \
+        '.tar.zst', '.tzst'
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.Lock()
+
+        self._members: Dict[str, Tuple[Optional[datetime], int]] = {}
+        """Время изменения и размер каждого файла в архиве, в порядке следования."""
+
+        self._last_read: Tuple[str, Optional[str]] = ('', None)
+        """Имя и чек-сумма последнего прочитанного члена архива."""
+
+        self._indices: Dict[str, int] = {}
+        """Номера файлов в порядке следования, см. :meth:`get_index`."""
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @classmethod
+    def is_archive(cls, path: Path) -> bool:
+        name = path.name.lower()
+        return any(name.endswith(x) for x in cls.ZIP_SUFFIXES + cls.TAR_SUFFIXES)
+
+    @classmethod
+    def create(cls, path: Path) -> 'FrameSource':
+        """:raises ValueError: архив не читается или его формат не поддерживается."""
+        name = path.name.lower()
+        if any(name.endswith(x) for x in cls.ZIP_SUFFIXES):
+            return ZipFrameSource(path)
+        if any(name.endswith(x) for x in cls.TAR_SUFFIXES):
+            return TarFrameSource(path)
+        raise ValueError(f'Unsupported archive: {path}')
+
+    def list_images(self) -> List[str]:
+        """Имена изображений в порядке следования в архиве."""
+        return [
+            name for name in self._members
+            if os.path.splitext(name)[1][1:].lower() in FileUtils.FRAME_EXTENSIONS
+        ]
+
+    def get_mtime(self, name: str) -> Optional[datetime]:
+        """This function does not throw exceptions."""
+        return self._members.get(name, (None, 0))[0]
+
+    def get_size(self, name: str) -> Optional[int]:
+        """This function does not throw exceptions."""
+        return self._members[name][1] if name in self._members else None
+
+    def get_index(self, name: str) -> int:
+        """Номер файла в порядке следования в архиве. This function does not throw exceptions."""
+        with self._lock:
+            if len(self._indices) != len(self._members):
+                self._indices = {x: i for i, x in enumerate(self._members)}
+        return self._indices.get(name, len(self._indices))
+
+    def read(self, name: str) -> bytes:
+        """Содержимое члена архива целиком.
+
+        :raises OSError: члена нет или архив не читается.
+        :raises ValueError: архив нельзя прочитать в таком порядке (см. :class:`TarFrameSource`).
+        """
+        with self._lock:
+            data = self._read(name)
+            self._last_read = (name, hashlib.sha1(data).hexdigest())
+            return data
+
+    def get_checksum(self, name: str) -> Optional[str]:
+        """Чек-сумма такая же, как у :meth:`FileUtils.get_checksum`. Если этот член архива был
+        прочитан последним, он не читается повторно.
+
+        :raises ValueError: архив нельзя прочитать в таком порядке (см. :class:`TarFrameSource`).
+        """
+        with self._lock:
+            if self._last_read[0] == name:
+                return self._last_read[1]
+        try:
+            self.read(name)
+        except OSError:
+            return None
+        return self._last_read[1]
+
+    def close(self):
+        """Закрывает архив. Вызывать не обязательно."""
+
+    @abstractmethod
+    def _read(self, name: str) -> bytes:
+        """Вызывается под блокировкой.
+
+        :raises OSError: члена нет или архив не читается.
+        :raises ValueError: архив нельзя прочитать в таком порядке.
+        """
+
+
+class ZipFrameSource(FrameSource):
+    """Архив ZIP с произвольным доступом к членам."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        try:
+            self._zip = zipfile.ZipFile(path.expanduser())
+        except (OSError, zipfile.BadZipFile) as error:
+            raise ValueError(f'Cannot read the archive: {path}') from error
+
+        for info in self._zip.infolist():
+            if info.is_dir():
+                continue
+            try:
+                mtime: Optional[datetime] = datetime(*info.date_time)
+            except ValueError:
+                mtime = None
+            self._members[info.filename] = (mtime, info.file_size)
+
+    def close(self):
+        with self._lock:
+            self._zip.close()
+
+    def _read(self, name: str) -> bytes:
+        try:
+            return self._zip.read(name)
+        except KeyError as error:
+            raise FileNotFoundError(name) from error
+        except (zipfile.BadZipFile, EOFError, zlib.error) as error:
+            raise OSError(f'{name}: {error}') from error
+
+
+class TarFrameSource(FrameSource):
+    """Архив tar. Несжатый читается с произвольным доступом. Сжатый (gzip, bzip2, xz, zstd)
+    читается потоком: курсор идёт только вперёд. Изображения, которые поток проходит по дороге
+    к нужному, складываются во временный файл и удаляются из него, как только прочитаны.
+    При чтении в порядке следования в архиве временный файл не нужен вовсе, а при чтении
+    вразнобой его размер ограничен :attr:`MAX_SPOOL_SIZE`.
+
+    Для zstd нужен модуль ``compression.zstd`` (Python 3.14) или пакет ``zstandard``.
+    """
+    ZSTD_SUFFIXES = '.tar.zst', '.tzst'
+
+    MAX_SPOOL_SIZE = 2 * 1024**3
+    """Сколько байт изображений, пройденных потоком, можно держать во временном файле."""
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        name = path.name.lower()
+        self._zstd = any(name.endswith(x) for x in self.ZSTD_SUFFIXES)
+        self._streaming = not name.endswith('.tar')
+
+        self._tar: Optional[tarfile.TarFile] = None
+        """Открытый архив: весь, если он несжатый, или текущий поток."""
+        self._raw: Optional[BinaryIO] = None
+        """Файл под распаковщиком zstd, его tarfile не закрывает сам."""
+        self._order: Dict[str, int] = {}
+        """Номер каждого файла среди всех членов архива."""
+        self._infos: Dict[str, tarfile.TarInfo] = {}
+        """Заголовки файлов несжатого архива, чтобы не искать их при каждом чтении."""
+        self._position = -1
+        """Номер члена архива, на котором стоит поток."""
+
+        self._spool: Optional[BinaryIO] = None
+        """Временный файл с изображениями, которые поток прошёл, но которые ещё не прочитаны."""
+        self._spooled: Dict[str, Tuple[int, int]] = {}
+        """Смещение и размер каждого изображения во временном файле."""
+        self._spooled_size = 0
+        """Сколько байт занимают изображения, ещё лежащие во временном файле."""
+        self._images: Set[str] = set()
+
+        try:
+            self._tar = self._open()
+            for index, info in enumerate(iter(self._tar.next, None)):
+                if info.isfile():
+                    mtime = datetime.fromtimestamp(info.mtime) if info.mtime else None
+                    self._members[info.name] = (mtime, info.size)
+                    self._order[info.name] = index
+                    if not self._streaming:
+                        self._infos[info.name] = info
+            if self._streaming:
+                self._close()
+            self._images = set(self.list_images())
+        except (OSError, tarfile.TarError, EOFError) as error:
+            self._close()
+            raise ValueError(f'Cannot read the archive: {path}') from error
+
+    def _open(self) -> tarfile.TarFile:
+        """:raises ValueError: нет модуля для zstd."""
+        path = self.path.expanduser()
+        if not self._streaming:
+            return tarfile.open(path, mode='r:')
+        if not self._zstd:
+            return tarfile.open(path, mode='r|*')
+
+        try:
+            from compression import zstd   # type: ignore
+            self._raw = zstd.open(path, 'rb')
+        except ImportError:
+            try:
+                import zstandard   # type: ignore
+            except ImportError:
+                raise ValueError('Reading .tar.zst requires Python 3.14 or the zstandard package.')
+            raw = path.open('rb')
+            self._raw = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return tarfile.open(fileobj=self._raw, mode='r|')
+
+    def close(self):
+        with self._lock:
+            self._close()
+            if self._spool:
+                self._spool.close()
+            self._spool = None
+            self._spooled.clear()
+            self._spooled_size = 0
+
+    def _close(self):
+        if self._tar:
+            self._tar.close()
+        if self._raw:
+            self._raw.close()
+        self._tar, self._raw = None, None
+        self._position = -1
+
+    def _write_spooled(self, name: str, data: bytes):
+        """:raises OSError: нет места на диске."""
+        if name in self._spooled:
+            return
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile(prefix='catframes-')
+        offset = self._spool.seek(0, io.SEEK_END)
+        self._spool.write(data)
+        self._spooled[name] = (offset, len(data))
+        self._spooled_size += len(data)
+
+    def _read_spooled(self, name: str) -> bytes:
+        """Читает изображение из временного файла и забывает о нём. Когда там ничего
+        не остаётся, файл усекается.
+        """
+        assert self._spool is not None
+        offset, size = self._spooled.pop(name)
+        self._spooled_size -= size
+        self._spool.seek(offset)
+        data = self._spool.read(size)
+        if not self._spooled:
+            self._spool.truncate(0)
+        return data
+
+    def _read(self, name: str) -> bytes:
+        if name not in self._order:
+            raise FileNotFoundError(name)
+
+        try:
+            if not self._streaming:
+                assert self._tar is not None
+                binary = self._tar.extractfile(self._infos[name])
+                assert binary is not None
+                return binary.read()
+
+            if name in self._spooled:
+                return self._read_spooled(name)
+
+            index = self._order[name]
+            if (self._tar is None) or (index <= self._position):
+                self._close()
+                self._tar = self._open()
+            assert self._tar is not None
+
+            for info in iter(self._tar.next, None):
+                self._position += 1
+                if (self._position == index) or (info.isfile() and info.name in self._images):
+                    binary = self._tar.extractfile(info)
+                    assert binary is not None
+                    data = binary.read()
+                    if self._position == index:
+                        return data
+                    if self._spooled_size + len(data) > self.MAX_SPOOL_SIZE:
+                        break
+                    self._write_spooled(info.name, data)
+            else:
+                self._close()
+                raise FileNotFoundError(name)
+        except (tarfile.TarError, EOFError, ValueError) as error:
+            self._close()
+            raise OSError(f'{name}: {error}') from error
+        except OSError:
+            self._close()
+            raise
+
+        self._close()
+        raise ValueError(f'{self.path}: reading the archive out of order needs more than ' +
+            f'{self.MAX_SPOOL_SIZE} bytes of temporary space.')
+
+
+class _FrameSourceTest(TestCase):
+    NAMES = 'day 10/2.png', 'day 2/1.png', 'day 2/10.png', 'day 2/2.png', 'notes.txt'
+
+    def _make_images(self, folder_path: Path) -> Path:
+        images = folder_path / 'images'
+        for i, name in enumerate(self.NAMES):
+            (images / name).parent.mkdir(parents=True, exist_ok=True)
+            if name.endswith('.png'):
+                Image.new('RGB', (16 + i, 9)).save(images / name)
+            else:
+                (images / name).write_text('-')
+        return images
+
+    def _check(self, source: FrameSource, images: Path):
+        self.assertEqual(sorted(self.NAMES[:-1]), sorted(source.list_images()))
+
+        # Порядок чтения не совпадает с порядком в архиве.
+        for name in reversed(sorted(self.NAMES[:-1])):
+            frame = Frame(source.path / name, source=source, member=name)
+            self.assertEqual(FileUtils.get_checksum(images / name), frame.checksum)
+            self.assertEqual(FileUtils.get_checksum(images / name), source.get_checksum(name))
+            self.assertEqual((16 + self.NAMES.index(name), 9),
+                (frame.resolution.width, frame.resolution.height))
+            self.assertEqual(os.path.getsize(images / name), source.get_size(name))
+
+        with self.assertRaises(OSError):
+            source.read('missing.png')
+        self.assertIsNone(source.get_checksum('missing.png'))
+        source.close()
+
+    def test_zip(self):
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            images = self._make_images(folder_path)
+            with zipfile.ZipFile(folder_path / 'x.zip', 'w') as archive:
+                for name in self.NAMES:
+                    archive.write(images / name, name)
+            self._check(FrameSource.create(folder_path / 'x.zip'), images)
+
+    def test_tar(self):
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            images = self._make_images(folder_path)
+            for suffix, mode in ('.tar', 'w'), ('.tar.gz', 'w:gz'), ('.tar.xz', 'w:xz'):
+                with tarfile.open(folder_path / f'x{suffix}', mode) as archive:
+                    for name in self.NAMES:
+                        archive.add(images / name, name)
+                self._check(FrameSource.create(folder_path / f'x{suffix}'), images)
+
+    def test_tar_single_pass(self):
+        """Сжатый архив распаковывается один раз за проход, в каком бы порядке ни читались
+        кадры. Прочитанное больше не занимает места во временном файле."""
+        opened = []
+
+        class CountingTarFrameSource(TarFrameSource):
+            def _open(self) -> tarfile.TarFile:
+                opened.append(1)
+                return super()._open()
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            images = self._make_images(folder_path)
+            with tarfile.open(folder_path / 'x.tar.gz', 'w:gz') as archive:
+                for name in reversed(self.NAMES):
+                    archive.add(images / name, name)
+
+            source = CountingTarFrameSource(folder_path / 'x.tar.gz')
+            opened.clear()
+            for name in sorted(self.NAMES[:-1]) * 2:
+                self.assertEqual((images / name).read_bytes(), source.read(name))
+            self.assertEqual(2, len(opened))
+            self.assertEqual(0, source._spooled_size)
+            source.close()
+
+    def test_tar_spool_limit(self):
+        """Если для чтения вразнобой нужно слишком много места, чтение прекращается."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            images = self._make_images(folder_path)
+            with tarfile.open(folder_path / 'x.tar.gz', 'w:gz') as archive:
+                for name in self.NAMES:
+                    archive.add(images / name, name)
+
+            source = TarFrameSource(folder_path / 'x.tar.gz')
+            source.MAX_SPOOL_SIZE = os.path.getsize(images / self.NAMES[0])
+            self.assertEqual((images / self.NAMES[1]).read_bytes(), source.read(self.NAMES[1]))
+            with self.assertRaises(ValueError):
+                source.read(self.NAMES[3])
+            self.assertEqual((images / self.NAMES[0]).read_bytes(), source.read(self.NAMES[0]))
+            source.close()
+
+    def test_bad_archive(self):
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            for name in 'x.zip', 'x.tar.gz', 'x.tgz':
+                path = Path(folder_path_string) / name
+                self.assertTrue(FrameSource.is_archive(path))
+                with self.assertRaises(ValueError):
+                    FrameSource.create(path)
+                path.write_bytes(b'12345')
+                with self.assertRaises(ValueError):
+                    FrameSource.create(path)
+        self.assertFalse(FrameSource.is_archive(Path('x.tar.7z')))
+
+
 @dataclass(frozen=True)
 class Resolution:
     """Non-zero size in pixels."""
@@ -503,28 +1147,34 @@ class Frame:
 
     :param message: Если это кадр-заглушка (баннер), этот текст будет выведен
     где-нибудь в центре кадра.
+
+    :param probe: Сразу прочитать файл (см. :meth:`probe`). Иначе кадр можно изучить позже,
+    например, только если он действительно попадёт в видео.
+
+    :param source: Архив, в котором лежит кадр. Тогда путь — условный (путь к архиву плюс
+    имя члена архива) и нужен только для отображения и группировки.
+
+    :param member: Имя члена архива.
     """
-    __slots__ = '_checksum', '_path', '_resolution', '_message', 'numdir', 'numvideo'
+    __slots__ = '_checksum', '_path', '_resolution', '_exif_time', '_message', '_probed', \
+        '_source', '_member', 'numdir', 'numvideo', 'mtime', 'inode'
 
-    def __init__(self, path: Union[Path, None], banner: bool = False, message: str = ''):
+    def __init__(self, path: Union[Path, None], banner: bool = False, message: str = '',
+            probe: bool = True, source: Optional[FrameSource] = None, member: str = ''):
         self._path = path
+        self._source = source
+        self._member = member
         self._resolution = None
-        self._checksum = FileUtils.get_checksum(path)
+        self._exif_time = None
+        self._checksum = None
         self._message = message
+        self._probed = False
 
         assert (path is None) == banner
         assert (self._path is None) == banner
 
-        # Чек-сумма может быть незаполнена не только из-за того, что путь незаполнен.
-        # Сюда же относятся все ошибки доступа к содержимому.
-        if self._checksum:
-            assert path is not None
-            try:
-                with Image.open(path.expanduser()) as image:
-                    width, height = image.size
-                    self._resolution = Resolution(width, height)
-            except OSError:
-                pass
+        if probe:
+            self.probe()
 
         self.numdir: int = 0
         """Каким он будет по счету в своей папке, если её содержимое отсортировать."""
@@ -532,6 +1182,77 @@ class Frame:
         self.numvideo: int = 0
         """Каким он будет по счету, если отсортировать изображения в папках и склеить эти списки."""
 
+        self.mtime: Optional[datetime] = None
+        """Время изменения файла на момент просмотра папки, если оно понадобилось."""
+
+        self.inode: int = 0
+        """Номер inode из просмотра папки или ноль, если неизвестен (см. :meth:`probe_all`)."""
+
+    def probe(self):
+        """Запоминает чек-сумму, разрешение файла и время съёмки из EXIF. Файл открывается
+        один раз, пиксели не декодируются. Повторные вызовы ничего не делают. Кадр считается
+        изученным, только когда чтение закончилось (успешно или нет), так что прерванное
+        по времени изучение можно повторить. Этот метод не выбрасывает исключений.
+        """
+        if self._probed:
+            return
+
+        if self._path is None:
+            self._probed = True
+            return
+
+        try:
+            with self.open() as binary:
+                self._checksum = FileUtils.get_stream_checksum(binary)
+                binary.seek(0)
+                with Image.open(binary) as image:
+                    width, height = image.size
+                    self._resolution = Resolution(width, height)
+                    self._exif_time = FileUtils.get_exif_time(image)
+        except (OSError, Image.DecompressionBombError):
+            pass
+        self._probed = True
+
+    @staticmethod
+    def probe_all(frames: Iterable['Frame']):
+        """Изучает кадры (см. :meth:`probe`) в порядке их расположения на диске, а не в порядке
+        последовательности: обычные файлы — по номерам inode, члены архива — в порядке
+        следования в архиве. На жёстких дисках и в сжатых архивах это избавляет от лишних
+        перемещений. Порядок самой последовательности не меняется.
+        """
+        def get_key(frame: Frame) -> Tuple[int, int, int]:
+            if frame.source:
+                return (1, id(frame.source), frame.source.get_index(frame.member))
+            return (0, 0, frame.inode)
+
+        for frame in sorted((x for x in frames if not x.banner), key=get_key):
+            frame.probe()
+
+    def open(self) -> BinaryIO:
+        """Открывает файл или член архива на чтение.
+
+        :raises OSError: файл не читается.
+        """
+        assert self._path is not None
+        if self._source:
+            return io.BytesIO(self._source.read(self._member))
+        return self._path.expanduser().open(mode='rb')
+
+    @property
+    def probed(self) -> bool:
+        """Был ли уже прочитан файл."""
+        return self._probed
+
+    @property
+    def source(self) -> Optional[FrameSource]:
+        """Архив, в котором лежит кадр. Незаполнено для обычных файлов."""
+        return self._source
+
+    @property
+    def member(self) -> str:
+        """Имя члена архива. Пустая строка для обычных файлов."""
+        return self._member
+
     @property
     def banner(self) -> bool:
         return (self._path is None)
@@ -563,14 +1284,21 @@ class Frame:
 
     @property
     def checksum(self) -> Union[str, None]:
-        """Незаполнено, если не удалось прочитать файл в момент создания объекта."""
+        """Незаполнено, если файл ещё не изучен (см. :meth:`probe`) или не читается."""
         return self._checksum
 
     @property
     def resolution(self) -> Union[Resolution, None]:
-        """Незаполнено, если не удалось прочитать файл в момент создания объекта."""
+        """Незаполнено, если файл ещё не изучен (см. :meth:`probe`) или не читается."""
         return self._resolution
 
+    @property
+    def exif_time(self) -> Union[datetime, None]:
+        """Местное время съёмки (EXIF DateTimeOriginal). Незаполнено, если файл ещё не изучен
+        (см. :meth:`probe`), не читается или в нём нет такой отметки.
+        """
+        return self._exif_time
+
 
 class _ResolutionTest(TestCase):
     def test_eq(self):
@@ -637,6 +1365,60 @@ class _FrameTest(TestCase):
         frame = Frame(root_dir / 'qwe.png')
         self.assertTrue(isinstance(frame.folder, str))
 
+    def test_lazy_probe(self):
+        """Файл читается не раньше вызова probe, и только один раз."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            path = Path(folder_path_string) / '1.png'
+            Image.new("RGB", (64, 48)).save(path)
+
+            frame = Frame(path, probe=False)
+            self.assertFalse(frame.probed)
+            self.assertIsNone(frame.checksum)
+            self.assertIsNone(frame.resolution)
+
+            frame.probe()
+            self.assertTrue(frame.probed)
+            self.assertEqual(str(Resolution(64, 48)), str(frame.resolution))
+
+            checksum = frame.checksum
+            Image.new("RGB", (32, 24)).save(path)
+            frame.probe()
+            self.assertEqual(checksum, frame.checksum)
+            self.assertEqual(str(Resolution(64, 48)), str(frame.resolution))
+
+    def test_probe_all(self):
+        """Порядок чтения не влияет на последовательность."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            for i in range(5):
+                Image.new("RGB", (64 + 2*i, 48)).save(folder_path / f'{i}.png')
+            entries = FileUtils.scan_images(folder_path)
+            FileUtils.sort_natural(entries)
+            frames = [Frame(Path(x.path), probe=False) for x in entries]
+            for frame, entry in zip(frames, entries):
+                frame.inode = FileUtils.get_entry_inode(entry)
+            frames.insert(2, Frame(None, True, 'Banner'))
+
+            sequence = frames.copy()
+            Frame.probe_all(frames)
+            self.assertEqual(sequence, frames)
+            self.assertEqual([64 + 2*i for i in range(5)],
+                [x.resolution.width for x in frames if not x.banner])
+
+    def test_exif_time(self):
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            exif = Image.Exif()
+            exif[FileUtils.EXIF_IFD_TAG] = {
+                FileUtils.EXIF_DATETIME_ORIGINAL_TAG: '2023:05:01 10:20:30'}
+            Image.new("RGB", (64, 48)).save(folder_path / '1.jpg', exif=exif)
+            Image.new("RGB", (64, 48)).save(folder_path / '2.jpg')
+
+            frame = Frame(folder_path / '1.jpg')
+            self.assertEqual(datetime(2023, 5, 1, 10, 20, 30), frame.exif_time)
+            self.assertEqual(FileUtils.get_checksum(frame.path), frame.checksum)
+            self.assertIsNone(Frame(folder_path / '2.jpg').exif_time)
+
 
 class ResolutionUtils:
     """Useful functions related to resolution."""
@@ -677,23 +1459,137 @@ class ResolutionUtils:
         height = src.height if src.height < goal.height else goal.height
         return Resolution(width, height)
 
+    @classmethod
+    def parse(cls, text: str) -> Resolution:
+        """Parses strings like `1920x1080`. Odd sides are rounded down.
+
+        :raises ValueError: the syntax is wrong or the result is too small.
+        """
+        match = re.fullmatch(r'\s*(\d+)\s*[xX×]\s*(\d+)\s*', text)
+        if not match:
+            raise ValueError(f'Bad resolution "{text}". Expected WxH.')
+
+        width, height = cls.round(int(match[1])), cls.round(int(match[2]))
+        if width < 2 or height < 2:
+            raise ValueError(f'The resolution {text} is too small.')
+
+        return Resolution(width, height)
+
+    @classmethod
+    def limit(cls, src: Resolution,
+            max_pixels: Optional[int] = None,
+            max_height: Optional[int] = None) -> Resolution:
+        """Proportionally reduces the resolution to fit the limits, if necessary.
+        The sides of the reduced resolution are even.
+        """
+        scale = 1.0
+        if max_height and (src.height > max_height):
+            scale = min(scale, max_height / src.height)
+        if max_pixels and (src.width * src.height > max_pixels):
+            scale = min(scale, math.sqrt(max_pixels / (src.width * src.height)))
+
+        if scale >= 1.0:
+            return src
+
+        return cls.scale(src, scale)
+
+    @classmethod
+    def scale(cls, src: Resolution, factor: float) -> Resolution:
+        """Proportionally changes the resolution. The sides of the result are even."""
+        return Resolution(
+            max(2, cls.round(src.width * factor)),
+            max(2, cls.round(src.height * factor)))
+
+
+class _ResolutionUtilsTest(TestCase):
+    def test_parse(self):
+        self.assertEqual(Resolution(1920, 1080), ResolutionUtils.parse('1920x1080'))
+        self.assertEqual(Resolution(1280, 720), ResolutionUtils.parse('1281X721'))
+        for text in '', '1920', '1920x', 'x1080', '1920*1080', '1x1', '-2x4':
+            with self.assertRaises(ValueError, msg=text):
+                ResolutionUtils.parse(text)
+
+    def test_limit(self):
+        """Пропорции сохраняются, стороны остаются чётными."""
+        source = Resolution(6000, 4000)
+        self.assertEqual(source, ResolutionUtils.limit(source))
+        self.assertEqual(source, ResolutionUtils.limit(source, 6000*4000, 4000))
+
+        self.assertEqual(Resolution(1620, 1080), ResolutionUtils.limit(source, max_height=1080))
+
+        limited = ResolutionUtils.limit(source, max_pixels=1920*1080)
+        self.assertLessEqual(limited.width * limited.height, 1920*1080)
+        self.assertEqual(0, limited.width % 2)
+        self.assertEqual(0, limited.height % 2)
+        self.assertAlmostEqual(source.ratio, limited.ratio, places=2)
+
+        both = ResolutionUtils.limit(source, max_pixels=1920*1080, max_height=720)
+        self.assertEqual(Resolution(1080, 720), both)
+
 
 class ResolutionStatistics:
-    """Знает, какие разрешения как часто используются."""
-    __slots__ = ('_table',)
+    """Знает, какие разрешения как часто используются.
+
+    Гистограммы ширин и высот поддерживаются по мере добавления кадров (:meth:`add`), поэтому
+    статистику можно собирать по частям, например, в параллельных потоках сканирования,
+    а потом объединять (:meth:`merge`).
+    """
+    __slots__ = '_table', '_widths', '_heights', '_by_width', '_by_height'
 
-    def __init__(self, frames: Sequence[Frame]):
+    def __init__(self, frames: Iterable[Frame] = ()):
         self._table: Dict[Resolution, int] = {}
+
+        self._widths: Dict[int, int] = {}
+        """Количество кадров для каждой ширины."""
+        self._heights: Dict[int, int] = {}
+        """Количество кадров для каждой высоты."""
+
+        self._by_width: Dict[int, Dict[int, int]] = {}
+        """Гистограммы высот кадров для каждой ширины."""
+        self._by_height: Dict[int, Dict[int, int]] = {}
+        """Гистограммы ширин кадров для каждой высоты."""
+
         for frame in frames:
-            if frame.resolution in self._table:
-                self._table[frame.resolution] += 1
-            elif isinstance(frame.resolution, Resolution):
-                self._table[frame.resolution] = 1
+            self.add(frame)
+
+    def add(self, frame: Frame):
+        """Учитывает кадр. Кадры без разрешения (заглушки, нечитаемые файлы) игнорируются."""
+        if isinstance(frame.resolution, Resolution):
+            self._count(frame.resolution, 1)
+
+    def merge(self, other: 'ResolutionStatistics'):
+        """Добавляет к этой статистике все кадры из другой."""
+        for resolution, count in other._table.items():
+            self._count(resolution, count)
+
+    def _count(self, resolution: Resolution, count: int):
+        width, height = resolution.width, resolution.height
+
+        self._table[resolution] = self._table.get(resolution, 0) + count
+        self._widths[width] = self._widths.get(width, 0) + count
+        self._heights[height] = self._heights.get(height, 0) + count
+
+        heights = self._by_width.setdefault(width, {})
+        heights[height] = heights.get(height, 0) + count
+
+        widths = self._by_height.setdefault(height, {})
+        widths[width] = widths.get(width, 0) + count
 
     def sort_by_count_desc(self) -> Sequence[Tuple[Resolution, int]]:
         """Возвращает разрешения в порядке убывания числа кадров."""
         return sorted(self._table.items(), key=itemgetter(1), reverse=True)
 
+    @staticmethod
+    def _find(histogram: Dict[int, int]) -> int:
+        """Самое частое значение из тех, что не меньше среднего взвешенного. Если таких
+        несколько, выбирается наибольшее.
+        """
+        total_value = sum(x * w for x, w in histogram.items())
+        total_weight = sum(histogram.values())
+        weighted_average = total_value / total_weight
+
+        return max((w, x) for x, w in histogram.items() if x >= weighted_average)[1]
+
     def choose(self) -> Resolution:
         """Решает, какое разрешение лучше использовать для видео.
 
@@ -723,71 +1619,34 @@ class ResolutionStatistics:
         выбрано может быть только разрешение 1280×800.
 
         У кадров 800×800 появятся поля по бокам, у кадров 1280×720 — сверху и снизу.
-        """
-        def find(xw_list: List[Tuple[int, int]]) -> int:
-            total_value = sum(a[0] * a[1] for a in xw_list)
-            total_weight = sum(a[1] for a in xw_list)
-            weighted_average = total_value / total_weight
-
-            filtered = [xw for xw in xw_list if xw[0] >= weighted_average]
-
-            # Здесь могут дублироваться значения, т.к. может быть
-            # много разрешений с одинаковой шириной или с одинаковой высотой.
-            # Нужно просуммировать количества в таких повторах.
-            
-            xmap: Dict[int, int] = {}
-            for xw in filtered:
-                if xw[0] in xmap:
-                    xmap[xw[0]] += xw[1]
-                else:
-                    xmap[xw[0]] = xw[1]
-
-            distinct = xmap.items()
-            max_weight = max(xw[1] for xw in distinct)
-
-            most_frequent = list(xw for xw in distinct if xw[1] == max_weight)
-            return round(max(xw[0] for xw in most_frequent))
-
-        def find_other_axis(x, keys: List[int], values: List[int], count: List[int]) -> int:
-            indices = [i for i, k in enumerate(keys) if k == x]
-            values2 = [v for i, v in enumerate(values) if i in indices]
-            count2 = [c for i, c in enumerate(count) if i in indices]
-            return ResolutionUtils.round(find(list(zip(values2, count2))))
 
+        Работает за время, линейное от числа различных значений ширины и высоты.
+        """
         if len(self._table) < 1:
             return Resolution(1280, 720)
 
-        res_list, count = zip(*self._table.items())
-        width = [resolution.width for resolution in res_list]
-        height = [resolution.height for resolution in res_list]
-
-        raw_result = Resolution(
-                find(list(zip(width, count))),
-                find(list(zip(height, count))))
+        raw_width = self._find(self._widths)
+        raw_height = self._find(self._heights)
 
         result = Resolution(
-                ResolutionUtils.round(raw_result.width),
-                ResolutionUtils.round(raw_result.height))
+                ResolutionUtils.round(raw_width),
+                ResolutionUtils.round(raw_height))
+
+        # Выбранная ширина (высота) всегда встречается в таблице, поэтому у неё есть
+        # своя гистограмма высот (ширин).
+        height_for_width = ResolutionUtils.round(self._find(self._by_width[raw_width]))
+        width_for_height = ResolutionUtils.round(self._find(self._by_height[raw_height]))
 
         alternatives = []
 
-        if result.height < ResolutionUtils.round(find_other_axis(raw_result.width, width, height, list(count))):
-            alternatives.append(Resolution(
-                result.width,
-                ResolutionUtils.round(find_other_axis(result.width, width, height, list(count)))
-            ))
+        if result.height < height_for_width:
+            alternatives.append(Resolution(result.width, height_for_width))
 
-        if result.width < ResolutionUtils.round(find_other_axis(raw_result.height, height, width, list(count))):
-            alternatives.append(Resolution(
-                ResolutionUtils.round(find_other_axis(result.height, height, width, list(count))),
-                result.height
-            ))
+        if result.width < width_for_height:
+            alternatives.append(Resolution(width_for_height, result.height))
 
-        if len(alternatives) == 1:
-            return alternatives[0]
-        elif len(alternatives) > 1:
-            alternatives.sort(key=lambda x: x.width*x.height, reverse=True)
-            return alternatives[0]
+        if alternatives:
+            return max(alternatives, key=lambda x: x.width*x.height)
 
         return result
 
@@ -1288,8 +2147,325 @@ class _ResolutionStatisticsTest(TestCase):
             resolution = resolution_table.choose()
             self.assertEqual(str(Resolution(718, 1190)), str(resolution))
 
-
-class FrameView(ABC):
+    def test_add_and_merge(self):
+        """Статистика, собранная по частям, должна давать тот же результат, что и общая."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            frames = []
+
+            def make_frame(i, w, h):
+                file = folder_path / (str(i) + '.jpg')
+                Image.new("RGB", (w, h)).save(file)
+                return Frame(file)
+
+            sizes = [(1056, 592, 12), (800, 592, 6), (1100, 718, 2), (1150, 718, 1),
+                (1190, 718, 2), (1400, 718, 1), (1280, 640, 6), (856, 480, 6)]
+
+            for i, (w, h, count) in enumerate(sizes):
+                frames.extend([make_frame(i, w, h)] * count)
+
+            random.shuffle(frames)
+            middle = len(frames) // 2
+
+            first = ResolutionStatistics(frames[:middle])
+            second = ResolutionStatistics()
+            for frame in frames[middle:]:
+                second.add(frame)
+            second.add(Frame(None, True, 'Message'))
+
+            first.merge(second)
+
+            whole = ResolutionStatistics(frames)
+            self.assertSequenceEqual(
+                sorted(map(str, whole.sort_by_count_desc())),
+                sorted(map(str, first.sort_by_count_desc())))
+
+            self.assertEqual(str(Resolution(1190, 718)), str(first.choose()))
+            self.assertEqual(str(whole.choose()), str(first.choose()))
+
+    def test_odd_width_with_alternative(self):
+        """Нечётная ширина не должна мешать поиску высоты для неё."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            file_1 = folder_path / '1.jpg'
+            file_2 = folder_path / '2.jpg'
+            file_3 = folder_path / '3.jpg'
+            file_4 = folder_path / '4.jpg'
+            Image.new("RGB", (1281, 1000)).save(file_1)
+            Image.new("RGB", (900, 800)).save(file_2)
+            Image.new("RGB", (1100, 800)).save(file_3)
+            Image.new("RGB", (200, 200)).save(file_4)
+
+            frames = [Frame(file_1)] * 6 + \
+                [Frame(file_2)] * 4 + \
+                [Frame(file_3)] * 4 + \
+                [Frame(file_4)] * 10
+
+            resolution = ResolutionStatistics(frames).choose()
+            self.assertEqual(str(Resolution(1280, 1000)), str(resolution))
+
+
+@dataclass(frozen=True)
+class SampleSize:
+    """Размер выборки кадров: либо количество, либо доля в процентах."""
+
+    count: Optional[int] = None
+    percent: Optional[float] = None
+
+    def __post_init__(self):
+        assert (self.count is None) != (self.percent is None)
+        if self.count is not None:
+            assert self.count > 0
+        else:
+            assert 0 < self.percent <= 100
+
+    def __str__(self):
+        return str(self.count) if self.count is not None else f'{self.percent:g}%'
+
+    @staticmethod
+    def parse(text: str) -> 'SampleSize':
+        """Разбирает строки вида ``N`` и ``P%``.
+
+        :raises ValueError: неправильный формат или значение вне допустимых пределов.
+        """
+        text = text.strip()
+        try:
+            if text.endswith('%'):
+                percent = float(text[:-1])
+                if not (0 < percent <= 100):
+                    raise ValueError
+                return SampleSize(percent=percent)
+            count = int(text)
+            if count < 1:
+                raise ValueError
+            return SampleSize(count=count)
+        except ValueError:
+            raise ValueError(f'Bad sample size "{text}". Expected N or P%.') from None
+
+    def get_count(self, total: int) -> int:
+        """Сколько кадров брать из набора размером total."""
+        if self.count is not None:
+            return min(self.count, total)
+        return min(total, math.ceil(total * self.percent / 100))
+
+
+class ResolutionSampler:
+    """Выбирает разрешение по случайной выборке кадров, не изучая остальные.
+
+    Выборка стратифицированная: каждая папка получает долю выборки пропорционально числу кадров
+    в ней (но хотя бы один кадр), а внутри папки кадры берутся по одному из равных интервалов.
+
+    Остальные кадры изучаются по ходу рендеринга (:meth:`check`). Если окажется, что они
+    заметно чаще выборки не вписываются в выбранное разрешение без уменьшения, будет выведено
+    предупреждение, а в строгом режиме — выброшено исключение.
+    """
+
+    MIN_OBSERVATIONS = 30
+    """Сколько кадров нужно изучить после выборки, чтобы сравнивать их с ней."""
+
+    Z_95 = 1.96
+    """Квантиль нормального распределения для 95-процентного доверительного интервала."""
+
+    def __init__(self, frames: Sequence[Frame], size: SampleSize, strict: bool = False,
+            seed: Optional[int] = None):
+        self._frames = frames
+        self._strict = strict
+        self._random = random.Random(seed)
+
+        self._sample: List[Frame] = self._pick(size)
+        self._sampled = set(map(id, self._sample))
+        Frame.probe_all(self._sample)
+
+        self._statistics = ResolutionStatistics(self._sample)
+        self._decision = self._statistics.choose()
+
+        sample_with_resolution = [x for x in self._sample if x.resolution]
+        self._sample_fit = self._wilson(
+            sum(1 for x in sample_with_resolution if self._fits(x.resolution)),
+            len(sample_with_resolution))
+
+        self._observed = 0
+        self._observed_fit = 0
+        self._warned = False
+
+    def _pick(self, size: SampleSize) -> List[Frame]:
+        folders: List[List[Frame]] = []
+        last_folder = None
+        for frame in self._frames:
+            if frame.banner:
+                continue
+            if frame.path.parent != last_folder:
+                folders.append([])
+                last_folder = frame.path.parent
+            folders[-1].append(frame)
+
+        total = sum(len(x) for x in folders)
+        if total < 1:
+            return []
+        count = size.get_count(total)
+
+        result = []
+        for folder in folders:
+            share = max(1, min(len(folder), round(count * len(folder) / total)))
+            for stratum in range(share):
+                start = stratum * len(folder) // share
+                end = (stratum + 1) * len(folder) // share
+                result.append(folder[self._random.randrange(start, end)])
+        return result
+
+    def _fits(self, resolution: Resolution) -> bool:
+        """Впишется ли кадр в выбранное разрешение без уменьшения."""
+        return (resolution.width <= self._decision.width + 1) and \
+            (resolution.height <= self._decision.height + 1)
+
+    @classmethod
+    def _wilson(cls, successes: int, total: int) -> Tuple[float, float]:
+        """Доверительный интервал Уилсона для доли успехов."""
+        if total < 1:
+            return 0.0, 1.0
+        z = cls.Z_95
+        share = successes / total
+        denominator = 1 + z*z/total
+        center = (share + z*z/(2*total)) / denominator
+        margin = z * math.sqrt(share*(1-share)/total + z*z/(4*total*total)) / denominator
+        return max(0.0, center - margin), min(1.0, center + margin)
+
+    @property
+    def statistics(self) -> ResolutionStatistics:
+        """Статистика выборки, дополняемая кадрами, изученными позже."""
+        return self._statistics
+
+    @property
+    def decision(self) -> Resolution:
+        """Разрешение, выбранное по выборке."""
+        return self._decision
+
+    def show(self):
+        """Рассказывает пользователю о выборке и о том, насколько ей можно доверять."""
+        total = Enumerator.count(self._frames)
+        low, high = self._sample_fit
+        print(f'Sample: {len(self._sample)} of {total} frames.', flush=True)
+        print('Frames that fit without downscaling: ' +
+            f'{low*100:.1f}%–{high*100:.1f}% (95% confidence).', flush=True)
+
+    def check(self, frame: Frame):
+        """Изучает кадр, не попавший в выборку, и сравнивает итог с выборкой.
+
+        :raises ValueError: в строгом режиме, если кадры явно расходятся с выборкой.
+        """
+        if frame.banner or (id(frame) in self._sampled):
+            return
+        frame.probe()
+        self.account(frame)
+
+    def account(self, frame: Frame):
+        """Сравнивает с выборкой кадр, который уже изучен где-то ещё (например, с ограничением
+        времени на чтение). Кадры выборки и неизученные кадры пропускаются.
+
+        :raises ValueError: в строгом режиме, если кадры явно расходятся с выборкой.
+        """
+        if frame.banner or (id(frame) in self._sampled) or not frame.resolution:
+            return
+
+        self._statistics.add(frame)
+        self._observed += 1
+        if self._fits(frame.resolution):
+            self._observed_fit += 1
+
+        if self._warned or (self._observed < self.MIN_OBSERVATIONS):
+            return
+
+        observed_low, observed_high = self._wilson(self._observed_fit, self._observed)
+        if observed_high < self._sample_fit[0]:
+            self._warned = True
+            message = 'The sample does not represent the frames: ' + \
+                f'only {self._observed_fit} of {self._observed} recent frames ' + \
+                f'fit into {self._decision} without downscaling.'
+            if self._strict:
+                raise ValueError(message)
+            print(f'\nWarning: {message}\n', flush=True)
+
+    def show_summary(self):
+        """Сравнивает решение с тем, что дал бы полный просмотр изученных кадров."""
+        full_decision = self._statistics.choose()
+        print(f'Frames probed: {len(self._sample) + self._observed}. ' +
+            f'Decision based on them: {full_decision} ' +
+            f'(the sample gave {self._decision}).', flush=True)
+
+
+class _ResolutionSamplerTest(TestCase):
+    def test_sample_size(self):
+        self.assertEqual(10, SampleSize.parse('10').get_count(1000))
+        self.assertEqual(5, SampleSize.parse('10').get_count(5))
+        self.assertEqual(25, SampleSize.parse('2.5%').get_count(1000))
+        self.assertEqual(1, SampleSize.parse('1%').get_count(3))
+        for text in '0', '-3', '0%', '101%', 'abc', '5%%':
+            with self.assertRaises(ValueError, msg=text):
+                SampleSize.parse(text)
+
+    def _make_frames(self, folder_path: Path, sizes: Sequence[Tuple[int, int, int]]):
+        folder_path.mkdir()
+        frames = []
+        for index, (width, height, count) in enumerate(sizes):
+            file = folder_path / f'{index}.png'
+            Image.new("RGB", (width, height)).save(file)
+            frames.extend(Frame(file, probe=False) for _ in range(count))
+        return frames
+
+    def test_stratified(self):
+        """Каждая папка попадает в выборку, остальные кадры не читаются."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            frames = self._make_frames(folder_path / 'a', [(640, 480, 90)]) + \
+                [Frame(None, True, 'Message')] * 10 + \
+                self._make_frames(folder_path / 'b', [(800, 600, 9)])
+
+            sampler = ResolutionSampler(frames, SampleSize(count=10), seed=1)
+            probed = [x for x in frames if x.probed and not x.banner]
+            self.assertEqual(10, len(set(map(id, probed))))
+            self.assertEqual(1, len([x for x in probed if x.folder == 'b']))
+
+            lines = sampler.statistics.sort_by_count_desc()
+            self.assertEqual(2, len(lines))
+
+            for frame in frames:
+                frame.probe()
+            full_decision = ResolutionStatistics(frames).choose()
+            self.assertEqual(str(full_decision), str(sampler.decision))
+
+    def test_disagreement(self):
+        """Если выборка не похожа на остальные кадры, в строгом режиме будет исключение."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            frames = self._make_frames(folder_path / 'a', [(640, 480, 1), (1920, 1080, 99)])
+
+            sampler = ResolutionSampler(frames[:1], SampleSize(count=1), strict=True)
+            self.assertEqual(1, len([x for x in frames if x.probed]))
+            self.assertEqual(str(Resolution(640, 480)), str(sampler.decision))
+
+            with self.assertRaises(ValueError):
+                for frame in frames:
+                    sampler.check(frame)
+            self.assertTrue(all(x.probed for x in frames[:1 + sampler.MIN_OBSERVATIONS]))
+
+    def test_frame_timeout(self):
+        """Кадры, изученные с ограничением времени, тоже сравниваются с выборкой."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            frames = self._make_frames(folder_path / 'a', [(640, 480, 1), (1920, 1080, 99)])
+
+            sampler = ResolutionSampler(frames[:1], SampleSize(count=1), strict=True)
+            view = DefaultFrameView(Resolution(640, 480), '#000', Layout(), frame_timeout=5)
+
+            with self.assertRaises(ValueError):
+                for frame in frames:
+                    view.probe_in_time(frame)
+                    sampler.account(frame)
+            lines = sampler.statistics.sort_by_count_desc()
+            self.assertEqual(1 + sampler.MIN_OBSERVATIONS, sum(x[1] for x in lines))
+
+
+class FrameView(ABC):
     """Appearance of a frame. It is responsible for adjusting the resolution, as well as for
     any other processing: adding inscriptions, adjusting brightness and contrast, etc.
     """
@@ -1299,25 +2475,44 @@ class FrameView(ABC):
         self.thumbnail: Queue = Queue(maxsize = 1)
         """A thread-safe channel for getting a thumbnail of a recently processed frame."""
 
+        self.pix_fmt: str = 'rgb24'
+        """FFmpeg pixel format of the data that :meth:`write` produces."""
+
     @abstractmethod
     def apply(self, frame: Frame) -> bytes:
         """It returns raw data in RGB24."""
 
+    def write(self, frame: Frame, pipe: BinaryIO):
+        """Writes the frame in :attr:`pix_fmt` into the pipe. By default, it is the same data
+        as :meth:`apply` returns.
+
+        :raises OSError: the pipe is closed.
+        """
+        pipe.write(self.apply(frame))
+
+    def get_input_options(self, frame_rate: int) -> List[str]:
+        """FFmpeg input options that describe what :meth:`write` produces."""
+        return [
+            '-f', 'rawvideo', '-c:v', 'rawvideo', '-pix_fmt', self.pix_fmt,
+            '-s', str(self.resolution),
+            '-r', str(frame_rate)
+        ]
+
 
 class Quality(Enum):
     """Абстракция над бесконечными настройками качества FFmpeg."""
 
-    HIGH = 1, 3, 'yuv444p'
+    HIGH = 1, 3, 'yuv444p', 95, 6, 12
     """Очень высокое, но всё же с потерями. Подходит для художественных таймлапсов, где важно
     сохранить текстуру, световые переливы, зернистость камеры. Битрейт — как у JPEG 75.
     """
 
-    MEDIUM = 12, 14, 'yuv422p'
+    MEDIUM = 12, 14, 'yuv422p', 90, 17, 26
     """Подойдёт почти для любых задач. Зернистость видео пропадает, градиенты становятся чуть
     грубее, картинка может быть чуть мутнее, но детали легко узнаваемы.
     """
 
-    POOR = 22, 31, 'yuv420p'
+    POOR = 22, 31, 'yuv420p', 75, 27, 40
     """Некоторые мелкие детали становятся неразличимыми."""
 
     def get_h264_crf(self, fps: int) -> int:
@@ -1330,9 +2525,22 @@ class Quality(Enum):
         Всё это логично для фильмов, но плохо для видеонаблюдения, где важен каждый кадр. Данный
         метод корректирует CRF обратно по частоте смены кадров.
         """
+        return self._correct_crf(self.value[0], fps)
+
+    def get_hevc_crf(self, fps: int) -> int:
+        """Шкала x265 сдвинута относительно x264 примерно на 5, поправка та же, что
+        в :meth:`get_h264_crf`."""
+        return self._correct_crf(self.value[4], fps)
+
+    def get_av1_crf(self, fps: int) -> int:
+        """Для SVT-AV1 и libaom (0–63), поправка та же, что в :meth:`get_h264_crf`."""
+        return self._correct_crf(self.value[5], fps)
+
+    @staticmethod
+    def _correct_crf(value: int, fps: int) -> int:
         if (fps < 1) or (fps > 60):
             raise ValueError('Unsupported frame rate.')
-        return round(self.value[0] + 2.3 * math.log2(60/fps))
+        return round(value + 2.3 * math.log2(60/fps))
 
     def get_vp9_crf(self) -> int:
         """Мои тесты показали, что опция CRF в VP9 не связана с частотой кадров."""
@@ -1341,6 +2549,144 @@ class Quality(Enum):
     def get_pix_fmt(self) -> str:
         return self.value[2]
 
+    def get_jpeg_quality(self) -> int:
+        """Для кадров, которые приходится сжимать в JPEG самим (``--codec=mjpeg-copy``)."""
+        return self.value[3]
+
+
+class EncoderProfiles:
+    """Таблица профилей: профиль → кодировщик FFmpeg → его опции. Профиль выбирает, что дороже:
+    время процессора или место на диске. CRF берётся из :class:`Quality` и сдвигается
+    на ``crf_offset``, если он указан.
+
+    Таблицу можно дополнить файлом JSON того же вида, например::
+
+        {"archive": {"libx265": {"-preset": "veryslow", "crf_offset": -2}},
+         "nas": {"libx264": {"-preset": "medium", "-threads": 2}}}
+
+    Опции кодировщика в существующем профиле заменяются по отдельности, новые профили
+    добавляются. Для кодировщика без записи в профиле используются его настройки
+    из ``balanced``.
+    """
+    ENCODERS: Dict[str, Sequence[str]] = {
+        'h264': ('libx264',),
+        'vp9': ('libvpx-vp9',),
+        'hevc': ('libx265',),
+        'av1': ('libsvtav1', 'libaom-av1'),
+        'ffv1': ('ffv1',),
+    }
+    """Кодировщики каждого кодека в порядке предпочтения."""
+
+    DEFAULT = 'balanced'
+    DRAFT = 'fastest'
+    AUTO = 'auto'
+    """Профиль, который создаёт ``--auto-preset``."""
+
+    PRESET_LADDERS: Dict[str, Tuple[str, Sequence[str]]] = {
+        'libx264': ('-preset', ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast',
+            'medium', 'slow', 'slower')),
+        'libx265': ('-preset', ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast',
+            'medium', 'slow', 'slower')),
+        'libvpx-vp9': ('-cpu-used', ('8', '7', '6', '5', '4', '3', '2')),
+        'libsvtav1': ('-preset', ('12', '11', '10', '9', '8', '7', '6', '5', '4')),
+        'libaom-av1': ('-cpu-used', ('10', '9', '8', '7', '6', '5', '4', '3')),
+    }
+    """Опция скорости каждого кодировщика и её значения от самого быстрого к самому
+    медленному (см. :meth:`OutputProcessor.calibrate_preset`)."""
+
+    PROFILES: Dict[str, Dict[str, Dict[str, Union[str, int]]]] = {
+        'fastest': {
+            'libx264': {'-preset': 'ultrafast', '-tune': 'fastdecode'},
+            'libvpx-vp9': {'-deadline': 'realtime', '-cpu-used': 8},
+            'libx265': {'-preset': 'ultrafast'},
+            'libsvtav1': {'-preset': 12},
+            'libaom-av1': {'-usage': 'realtime', '-cpu-used': 10, '-row-mt': 1},
+            'ffv1': {'-level': 3, '-slices': 16, '-slicecrc': 0},
+        },
+        'balanced': {
+            'libx264': {'-preset': 'fast', '-tune': 'fastdecode'},
+            'libvpx-vp9': {'-deadline': 'realtime', '-cpu-used': 4},
+            'libx265': {'-preset': 'fast'},
+            'libsvtav1': {'-preset': 8},
+            'libaom-av1': {'-cpu-used': 6, '-row-mt': 1},
+            'ffv1': {'-level': 3, '-slices': 4, '-slicecrc': 1},
+        },
+        'archive': {
+            'libx264': {'-preset': 'slow'},
+            'libvpx-vp9': {'-deadline': 'good', '-cpu-used': 2, '-row-mt': 1},
+            'libx265': {'-preset': 'slow'},
+            'libsvtav1': {'-preset': 4},
+            'libaom-av1': {'-cpu-used': 3, '-row-mt': 1},
+            'ffv1': {'-level': 3, '-slices': 4, '-slicecrc': 1, '-g': 1},
+        },
+    }
+
+    def __init__(self):
+        self._profiles = {k: {e: dict(o) for e, o in v.items()} for k, v in self.PROFILES.items()}
+
+    @property
+    def names(self) -> Sequence[str]:
+        return tuple(self._profiles)
+
+    def load(self, path: Path):
+        """Дополняет таблицу из файла.
+
+        :raises ValueError: файл не читается или не той структуры.
+        """
+        try:
+            with path.expanduser().open(encoding='utf-8') as config:
+                profiles = json.load(config)
+        except (OSError, ValueError) as error:
+            raise ValueError(f'Cannot read encoder profiles: {path}\n{error}') from error
+
+        def is_dict(value) -> bool:
+            return isinstance(value, dict) and all(isinstance(x, str) for x in value)
+
+        if not is_dict(profiles) or not all(is_dict(x) for x in profiles.values()) or \
+                not all(is_dict(x) for p in profiles.values() for x in p.values()):
+            raise ValueError(f'Encoder profiles must be objects of objects: {path}')
+
+        for name, encoders in profiles.items():
+            for encoder, options in encoders.items():
+                if not all(isinstance(x, (str, int)) for x in options.values()):
+                    raise ValueError(f'Bad options of {encoder} in "{name}": {path}')
+                self._profiles.setdefault(name, {}).setdefault(encoder, {}).update(options)
+
+    def set(self, profile: str, encoder: str, options: Dict[str, Union[str, int]]):
+        """Задаёт опции кодировщика в профиле, создавая профиль, если его нет."""
+        self._profiles.setdefault(profile, {})[encoder] = dict(options)
+
+    def get(self, profile: str, encoder: str) -> Dict[str, Union[str, int]]:
+        """Опции кодировщика, включая ``crf_offset``, если он задан."""
+        options = self._profiles[profile].get(encoder)
+        if options is None:
+            options = self._profiles[self.DEFAULT].get(encoder, {})
+        return dict(options)
+
+
+class _EncoderProfilesTest(TestCase):
+    def test_load(self):
+        profiles = EncoderProfiles()
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            path = Path(folder_path_string) / 'profiles.json'
+            path.write_text(json.dumps({
+                'archive': {'libx264': {'-preset': 'veryslow', 'crf_offset': -2}},
+                'nas': {'libx265': {'-preset': 'medium'}},
+            }))
+            profiles.load(path)
+
+            path.write_text('{"nas": ["-preset", "medium"]}')
+            with self.assertRaises(ValueError):
+                profiles.load(path)
+            with self.assertRaises(ValueError):
+                profiles.load(path.with_name('missing.json'))
+
+        self.assertEqual({'-preset': 'veryslow', 'crf_offset': -2}, profiles.get('archive', 'libx264'))
+        self.assertEqual({'-preset': 'medium'}, profiles.get('nas', 'libx265'))
+        self.assertEqual(profiles.get('balanced', 'ffv1'), profiles.get('nas', 'ffv1'))
+        self.assertIn('nas', profiles.names)
+        self.assertEqual({'-preset': 'slow'}, EncoderProfiles().get('archive', 'libx264'))
+
 
 @dataclass(frozen=True)
 class OutputOptions:
@@ -1356,52 +2702,597 @@ class OutputOptions:
     limit_seconds: Union[int, None]
     live_preview: bool
 
+    draft: bool
+    """Черновой режим: кадры берутся равномерно по всей последовательности (а не только из
+    её начала), а кодек работает с самыми быстрыми настройками.
+    """
+
+    DRAFT_SECONDS = 10
+    """Длина чернового видео, если не указано ограничение."""
+
+    DRAFT_SCALE = 0.25
+    """Доля разрешения чернового видео, если не указана другая."""
+
+    transport: str = 'pipe'
+    """Как кадры попадают в FFmpeg: через его stdin (``pipe``) или через именованный канал
+    во временной папке (``fifo``, только POSIX). Во втором случае stdin FFmpeg не занят.
+    """
+
+    TRANSPORTS = 'pipe', 'fifo'
+
+    codec: str = 'auto'
+    """``auto`` выбирается по расширению: H.264 для mp4, VP9 для webm. ``mjpeg-copy`` кладёт
+    файлы JPEG в mkv или avi как есть, остальные кадры сжимает в JPEG (см. :class:`JpegCopyView`).
+    """
+
+    CODEC_SUFFIXES = {
+        'auto': ('.mp4', '.webm'),
+        'h264': ('.mp4', '.mkv'),
+        'vp9': ('.webm', '.mkv'),
+        'hevc': ('.mp4', '.mkv'),
+        'av1': ('.mp4', '.webm', '.mkv'),
+        'ffv1': ('.mkv', '.avi'),
+        'mjpeg-copy': ('.mkv', '.avi'),
+    }
+
+    profile: str = EncoderProfiles.DEFAULT
+    """Профиль кодировщика из :attr:`profiles`. В черновом режиме — всегда самый быстрый."""
+
+    profiles: EncoderProfiles = field(default_factory=EncoderProfiles)
+
+    area: Optional[Tuple[int, int, int, int]] = None
+    """Часть кадра для этого видео: ширина, высота, x, y (см. :class:`LadderFrameView`)."""
+
     def __post_init__(self):
         assert 1 <= self.frame_rate <= 60
         assert isinstance(self.quality, Quality)
         assert isinstance(self.destination, Path)
         assert isinstance(self.overwrite, bool)
+        assert isinstance(self.draft, bool)
+        assert self.transport in self.TRANSPORTS
+        assert self.destination.suffix in self.CODEC_SUFFIXES[self.codec]
+        assert self.profile in self.profiles.names
         if self.limit_seconds is not None:
             assert self.limit_seconds > 0
 
-    @staticmethod
-    def get_supported_suffixes() -> Sequence[str]:
+    @classmethod
+    def get_supported_suffixes(cls) -> Sequence[str]:
         """Возвращает поддерживаемые расширения файлов."""
-        return '.mp4', '.webm'
+        return tuple(dict.fromkeys(itertools.chain.from_iterable(cls.CODEC_SUFFIXES.values())))
+
+    def get_codec(self) -> str:
+        """Кодек, где ``auto`` заменён выбранным по расширению."""
+        if 'auto' != self.codec:
+            return self.codec
+        return 'vp9' if '.webm' == self.destination.suffix else 'h264'
+
+    def get_profile(self) -> str:
+        return EncoderProfiles.DRAFT if self.draft else self.profile
 
     def limit_frames(self, frames: Sequence[Frame]):
-        if self.limit_seconds:
+        if self.draft:
+            max_count = (self.limit_seconds or self.DRAFT_SECONDS) * self.frame_rate
+            step = max(1, math.ceil(len(frames) / max_count))
+            frames = frames[::step][:max_count]
+        elif self.limit_seconds:
             frames = frames[:(self.limit_seconds*self.frame_rate)]
         return frames
 
 
+class _OutputOptionsTest(TestCase):
+    @staticmethod
+    def _get_options(limit_seconds: Optional[int], draft: bool) -> OutputOptions:
+        return OutputOptions(
+            frame_rate=10,
+            quality=Quality.MEDIUM,
+            destination=Path('video.mp4'),
+            overwrite=False,
+            limit_seconds=limit_seconds,
+            live_preview=False,
+            draft=draft)
+
+    def test_limit(self):
+        """Без чернового режима берётся начало последовательности."""
+        frames = [Frame(None, True, str(i)) for i in range(1000)]
+        self.assertEqual(frames, self._get_options(None, False).limit_frames(frames))
+        self.assertEqual(frames[:30], self._get_options(3, False).limit_frames(frames))
+
+    def test_draft(self):
+        """В черновом режиме кадры берутся по всей последовательности."""
+        frames = [Frame(None, True, str(i)) for i in range(1000)]
+
+        limited = self._get_options(3, True).limit_frames(frames)
+        self.assertEqual(frames[::34], limited)
+
+        limited = self._get_options(None, True).limit_frames(frames)
+        self.assertEqual(OutputOptions.DRAFT_SECONDS * 10, len(limited))
+        self.assertEqual(frames[::10], limited)
+
+        self.assertEqual(frames[:20], self._get_options(None, True).limit_frames(frames[:20]))
+
+
+class _OutputProcessorTest(TestCase):
+    def test_output_tail(self):
+        """Промежуточные состояния строки статистики не попадают в хвост."""
+        chunks = [b'line 1\nframe=  1\rfr', b'ame=  2\rframe=  3\n\nError \xd0\xbe', b'\xd0\xb9\n']
+        self.assertEqual('line 1\nframe=  3\nError ой', OutputProcessor._get_output_tail(chunks))
+
+        lines = [f'{x}\n'.encode() for x in range(100)]
+        tail = OutputProcessor._get_output_tail(lines).split('\n')
+        self.assertEqual(OutputProcessor.OUTPUT_TAIL_LINES, len(tail))
+        self.assertEqual('99', tail[-1])
+
+    def test_codec_options(self):
+        """Профиль задаёт опции кодировщика, CRF берётся из качества."""
+        self.addCleanup(setattr, OutputProcessor, '_encoders', OutputProcessor._encoders)
+        OutputProcessor._encoders = ' V....D libx264 \n V....D libx265 \n V....D libaom-av1 \n V.S..D ffv1 \n'
+
+        def get_options(destination: str, codec: str = 'auto', draft: bool = False,
+                profile: str = EncoderProfiles.DEFAULT) -> str:
+            options = OutputOptions(frame_rate=60, quality=Quality.POOR,
+                destination=Path(destination), overwrite=False, limit_seconds=None,
+                live_preview=False, draft=draft, codec=codec, profile=profile)
+            return ' '.join(OutputProcessor(options)._get_codec_options())
+
+        self.assertEqual('-pix_fmt yuv420p -c:v libx264 -preset fast -tune fastdecode ' +
+            '-crf 22 -movflags +faststart', get_options('video.mp4'))
+        self.assertIn('-preset ultrafast', get_options('video.mp4', draft=True))
+        self.assertIn('-preset slow', get_options('video.mkv', 'h264', profile='archive'))
+        self.assertIn('-c:v libx265 -preset fast -crf 27 -movflags +faststart -tag:v hvc1',
+            get_options('video.mp4', 'hevc'))
+        self.assertIn('-c:v libaom-av1', get_options('video.webm', 'av1'))
+        self.assertNotIn('-crf', get_options('video.mkv', 'ffv1'))
+        with self.assertRaises(ValueError):
+            get_options('video.webm', 'vp9')
+
+    def test_also_options(self):
+        """Дополнительные видео сжимаются тем же FFmpeg, каждое своим кодировщиком."""
+        self.addCleanup(setattr, OutputProcessor, '_encoders', OutputProcessor._encoders)
+        OutputProcessor._encoders = ' V....D libx264 \n V....D libvpx-vp9 \n'
+
+        def get_options(destination: str, quality: Quality = Quality.MEDIUM) -> OutputOptions:
+            return OutputOptions(frame_rate=30, quality=quality,
+                destination=Path(destination), overwrite=False, limit_seconds=None,
+                live_preview=False, draft=False)
+
+        processor = OutputProcessor(get_options('video.mp4'),
+            [get_options('video.webm', Quality.POOR)])
+        result = ' '.join(processor._get_output_options(Resolution(640, 480), 'null'))
+        self.assertTrue(result.startswith(
+            '-filter_complex [0:v]null,split=2[in0][in1];[in0]null[out0];[in1]null[out1] ' +
+            '-map [out0] -pix_fmt yuv422p -c:v libx264 '))
+        self.assertIn(' -n video.mp4 -map [out1] -pix_fmt yuv420p -c:v libvpx-vp9 ', result)
+        self.assertTrue(result.endswith(' -r 30 -n video.webm'))
+
+        ladder = [
+            replace(get_options(f'video_{x[1]}p.webm'), area=x)
+            for x in ((640, 480, 0, 0), (320, 240, 0, 480))
+        ]
+        result = OutputProcessor(ladder[0], ladder[1:])._get_output_options(
+            Resolution(640, 720), 'null')
+        self.assertEqual(['-filter_complex', '[0:v]null,split=2[in0][in1];' +
+            '[in0]crop=640:480:0:0[out0];[in1]crop=320:240:0:480[out1]'], result[:2])
+
+        processor = OutputProcessor(get_options('video.mp4'))
+        result = processor._get_output_options(Resolution(640, 480), 'scale=64:48')
+        self.assertEqual(['-vf', 'scale=64:48', '-pix_fmt'], result[:3])
+        self.assertNotIn('-vf', processor._get_output_options(Resolution(640, 480), 'null'))
+
+    def test_vp9_threading(self):
+        """Колонки тайлов ограничены и ядрами, и шириной кадра."""
+        def get_threading(width: int, cpu_count: int) -> Tuple[int, int]:
+            result = OutputProcessor._get_vp9_threading(Resolution(width, width), cpu_count)
+            self.assertEqual(1, result['-row-mt'])
+            return int(result['-tile-columns']), int(result['-threads'])
+
+        self.assertEqual((0, 1), get_threading(3840, 1))
+        self.assertEqual((1, 2), get_threading(3840, 2))
+        self.assertEqual((1, 3), get_threading(3840, 3))
+        self.assertEqual((2, 4), get_threading(1920, 4))
+        self.assertEqual((2, 16), get_threading(1920, 16))
+        self.assertEqual((3, 16), get_threading(3840, 16))
+        self.assertEqual((1, 8), get_threading(640, 8))
+        self.assertEqual((0, 8), get_threading(320, 8))
+
+    def test_cached_preset(self):
+        """Пресет из кэша попадает в профиль auto, профиль пользователя сохраняется."""
+        self.addCleanup(setattr, OutputProcessor, '_encoders', OutputProcessor._encoders)
+        OutputProcessor._encoders = ' V....D libx264 \n'
+        view = DefaultFrameView(Resolution(640, 480), '#000', Layout())
+
+        def make_processor(quality: Quality) -> OutputProcessor:
+            return OutputProcessor(OutputOptions(frame_rate=30, quality=quality,
+                destination=Path('video.mp4'), overwrite=False, limit_seconds=None,
+                live_preview=False, draft=False))
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            cache_path = Path(folder_path_string) / 'presets.json'
+            processor = make_processor(Quality.MEDIUM)
+            key = processor._get_preset_cache_key('libx264', view)
+            self.assertIn(f' crf {Quality.MEDIUM.get_h264_crf(30)}', key)
+            cache_path.write_text(json.dumps({key: 'veryfast'}))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor.calibrate_preset(view, [], cache_path)
+
+            codec_options = ' '.join(processor._get_codec_options())
+            self.assertIn('-preset veryfast', codec_options)
+            self.assertIn('-tune fastdecode', codec_options)
+
+            # Для другого качества пресет измеряется заново.
+            processor = make_processor(Quality.HIGH)
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor.calibrate_preset(view, [], cache_path)
+            self.assertNotIn('-preset veryfast', ' '.join(processor._get_codec_options()))
+
+    def test_failed_calibration(self):
+        """Если FFmpeg не сжал ни одного кадра, пресет не запоминается и не меняется."""
+        self.addCleanup(setattr, OutputProcessor, '_encoders', OutputProcessor._encoders)
+        OutputProcessor._encoders = ' V....D libx264 \n'
+        view = DefaultFrameView(Resolution(64, 48), '#000', Layout())
+
+        class FailingOutputProcessor(OutputProcessor):
+            def _measure_encoder(self, view, rendered, overrides) -> float:
+                return 0
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            cache_path = Path(folder_path_string) / 'presets.json'
+            options = OutputOptions(frame_rate=30, quality=Quality.MEDIUM,
+                destination=Path('video.mp4'), overwrite=False, limit_seconds=None,
+                live_preview=False, draft=False)
+            processor = FailingOutputProcessor(options)
+            frames = [Frame(Path(folder_path_string) / f'{i}.png', probe=False) for i in range(3)]
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor.calibrate_preset(view, frames, cache_path)
+
+            self.assertFalse(cache_path.exists())
+            self.assertIn('-preset fast ', ' '.join(processor._get_codec_options()))
+
+    @skipUnless(shutil.which('ffmpeg'), 'FFmpeg not found')
+    def test_also(self):
+        """Кадры рисуются один раз на все видео."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+
+            def get_options(name: str, quality: Quality) -> OutputOptions:
+                return OutputOptions(frame_rate=10, quality=quality,
+                    destination=folder_path / name, overwrite=False, limit_seconds=None,
+                    live_preview=False, draft=True)
+
+            view = DefaultFrameView(Resolution(64, 48), '#f00', Layout())
+            frames = [Frame(None, True, str(i)) for i in range(5)]
+            rendered: List[Frame] = []
+            processor = OutputProcessor(get_options('video.mp4', Quality.MEDIUM),
+                [get_options('video.webm', Quality.POOR), get_options('copy.mp4', Quality.HIGH)])
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor.make(view, frames, on_frame=rendered.append)
+
+            self.assertEqual(frames, rendered)
+            for name in 'video.mp4', 'video.webm', 'copy.mp4':
+                self.assertGreater((folder_path / name).stat().st_size, 0)
+
+    @skipUnless(os.environ.get('CATFRAMES_BENCHMARK'), 'set CATFRAMES_BENCHMARK=1 to run')
+    def test_transport_benchmark(self):
+        """Сравнивает способы передачи кадров в FFmpeg, который их только читает.
+        Кадры не рисуются, так что измеряется сама передача.
+        """
+        class ConstantView(FrameView):
+            def __init__(self, resolution: Resolution):
+                super().__init__(resolution)
+                self._data = bytes(resolution.width * resolution.height * 3)
+
+            def apply(self, frame: Frame) -> bytes:
+                return self._data
+
+        def measure(transport: str, pipe_size: int, resolution: Resolution, count: int):
+            class NullOutputProcessor(OutputProcessor):
+                PIPE_SIZE = pipe_size
+
+                def _get_codec_options(self, overrides=None, resolution=None) -> Sequence[str]:
+                    return ['-f', 'null']
+
+            options = OutputOptions(frame_rate=30, quality=Quality.MEDIUM,
+                destination=Path('null.mp4'), overwrite=True, limit_seconds=None,
+                live_preview=False, draft=False, transport=transport)
+            frames = [Frame(None, True, str(i)) for i in range(count)]
+
+            start = monotonic()
+            with contextlib.redirect_stdout(io.StringIO()):
+                NullOutputProcessor(options).make(ConstantView(resolution), frames)
+            return count / (monotonic() - start)
+
+        transports = [('pipe', 65536), ('pipe', OutputProcessor.PIPE_SIZE)]
+        if hasattr(os, 'mkfifo'):
+            transports.append(('fifo', OutputProcessor.PIPE_SIZE))
+
+        for resolution, count in (Resolution(1920, 1080), 300), (Resolution(3840, 2160), 75):
+            for transport, pipe_size in transports:
+                fps = measure(transport, pipe_size, resolution, count)
+                print(f'{resolution} {transport} {pipe_size >> 10} KiB: {fps:.1f} fps',
+                    file=sys.stderr, flush=True)
+
+
 class OutputProcessor:
-    def __init__(self, options: OutputOptions):
+    OUTPUT_CHUNK_SIZE = 65536
+    OUTPUT_TAIL_CHUNKS = 16
+    OUTPUT_TAIL_LINES = 30
+
+    PIPE_SIZE = 1 << 20
+    """Буфер канала в Linux. По умолчанию он 64 КиБ, и кадр Full HD (6 МиБ) проходит через
+    сотню переключений контекста. 1 МиБ — предел для непривилегированного процесса
+    (/proc/sys/fs/pipe-max-size).
+    """
+
+    def __init__(self, options: OutputOptions, also: Sequence[OutputOptions] = ()):
+        """:param also: Ещё видео из тех же кадров. Их сжимает тот же процесс FFmpeg, так что
+            кадр рисуется и передаётся один раз, а темп задаёт самый медленный кодировщик.
+            Частота кадров, ограничение длины и прочее, что касается кадров, берутся из
+            ``options``.
+        """
         self._options = options
+        self._also = [OutputProcessor(x) for x in also]
         self._exit_lock = threading.Lock()
         self._write_pixels_control: Queue = Queue(maxsize = 10)
 
-    def _get_h264_options(self) -> Sequence[str]:
-        # There is no point in adjusting the gaps between keyframes: most modern players
-        # are able to rewind accurately, even if there are large gaps between them.
-        h264_crf = self._options.quality.get_h264_crf(self._options.frame_rate)
-        return [
+    _encoders: Optional[str] = None
+    """Вывод ``ffmpeg -encoders``, чтобы спросить его один раз."""
+
+    @classmethod
+    def _find_encoder(cls, codec: str) -> str:
+        """Первый из кодировщиков кодека, который есть в этой сборке FFmpeg.
+
+        :raises ValueError: ни одного нет.
+        """
+        if cls._encoders is None:
+            try:
+                cls._encoders = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                    encoding='utf-8', errors='replace').stdout
+            except OSError:
+                cls._encoders = ''
+
+        candidates = EncoderProfiles.ENCODERS[codec]
+        for encoder in candidates:
+            if re.search(rf'\s{re.escape(encoder)}\s', cls._encoders):
+                return encoder
+        if not cls._encoders:
+            return candidates[0]  # Let FFmpeg explain what is wrong.
+        raise ValueError(f'FFmpeg has no encoder for {codec}: {", ".join(candidates)}.')
+
+    def _get_crf(self, encoder: str) -> Optional[int]:
+        quality, fps = self._options.quality, self._options.frame_rate
+        if 'libx264' == encoder:
+            return quality.get_h264_crf(fps)
+        elif 'libvpx-vp9' == encoder:
+            return quality.get_vp9_crf()
+        elif 'libx265' == encoder:
+            return min(51, quality.get_hevc_crf(fps))
+        elif encoder in ('libsvtav1', 'libaom-av1'):
+            return min(63, quality.get_av1_crf(fps))
+        return None  # FFV1 is lossless.
+
+    VP9_MIN_TILE_WIDTH = 256
+    """Колонки тайлов уже этого libvpx не делает."""
+
+    @staticmethod
+    def get_cpu_count() -> int:
+        """Ядра, доступные процессу. This function does not throw exceptions."""
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0)) or 1
+        return os.cpu_count() or 1
+
+    @classmethod
+    def _get_vp9_threading(cls, resolution: Resolution,
+            cpu_count: int) -> Dict[str, Union[str, int]]:
+        """Без этих опций libvpx-vp9 сжимает кадр в один поток на колонку тайлов, а колонка
+        по умолчанию одна. Колонок (их двоичный логарифм) не больше, чем ядер и чем помещается
+        в ширину кадра; ``-row-mt`` занимает остальные ядра строками внутри колонок.
+        """
+        tile_columns = 0
+        while (2 << tile_columns <= cpu_count) and \
+                (resolution.width >> (tile_columns + 1) >= cls.VP9_MIN_TILE_WIDTH):
+            tile_columns += 1
+        return {'-row-mt': 1, '-tile-columns': tile_columns, '-threads': cpu_count}
+
+    def _get_codec_options(self,
+            overrides: Optional[Dict[str, Union[str, int]]] = None,
+            resolution: Optional[Resolution] = None) -> Sequence[str]:
+        """:param overrides: Опции кодировщика поверх профиля.
+        :param resolution: Разрешение видео, чтобы распределить работу по ядрам.
+        """
+        codec = self._options.get_codec()
+        if 'mjpeg-copy' == codec:
+            return ['-c:v', 'copy']
+
+        encoder = self._find_encoder(codec)
+        settings: Dict[str, Union[str, int]] = {}
+        if resolution and ('libvpx-vp9' == encoder):
+            settings.update(self._get_vp9_threading(resolution, self.get_cpu_count()))
+        settings.update(self._options.profiles.get(self._options.get_profile(), encoder))
+        settings.update(overrides or {})
+        crf_offset = int(settings.pop('crf_offset', 0))
+
+        result = [
             '-pix_fmt', self._options.quality.get_pix_fmt(),
-            '-c:v', 'libx264',
-            '-preset', 'fast', '-tune', 'fastdecode',
-            '-movflags', '+faststart',
-            '-crf', str(h264_crf)
+            '-c:v', encoder,
         ]
+        for option, value in settings.items():
+            result.extend([option, str(value)])
+
+        crf = self._get_crf(encoder)
+        if crf is not None:
+            result.extend(['-crf', str(max(0, crf + crf_offset))])
+        if encoder in ('libvpx-vp9', 'libaom-av1'):
+            result.extend(['-b:v', '0'])  # Constant quality, not constrained.
+
+        if '.mp4' == self._options.destination.suffix:
+            # There is no point in adjusting the gaps between keyframes: most modern players
+            # are able to rewind accurately, even if there are large gaps between them.
+            result.extend(['-movflags', '+faststart'])
+            if 'libx265' == encoder:
+                result.extend(['-tag:v', 'hvc1'])  # Otherwise Apple players refuse it.
+        return result
 
-    def _get_vp9_options(self) -> Sequence[str]:
-        vp9_crf = self._options.quality.get_vp9_crf()
-        return [
-            '-c:v', 'libvpx-vp9',
-            '-deadline', 'realtime',
-            '-cpu-used', '4',
-            '-pix_fmt', self._options.quality.get_pix_fmt(),
-            '-crf', str(vp9_crf), '-b:v', '0'
+    @classmethod
+    def _enlarge_pipe(cls, pipe: BinaryIO):
+        """Увеличивает буфер канала до :attr:`PIPE_SIZE`, если это Linux и лимиты позволяют.
+        This function does not throw exceptions.
+        """
+        if not sys.platform.startswith('linux'):
+            return
+        import fcntl
+        try:
+            fcntl.fcntl(pipe.fileno(), getattr(fcntl, 'F_SETPIPE_SZ', 1031), cls.PIPE_SIZE)
+        except (OSError, ValueError):
+            pass  # The user has exceeded pipe-user-pages-soft, it's not an error.
+
+    @classmethod
+    def _open_input(cls, process: subprocess.Popen, input_path: str) -> Optional[BinaryIO]:
+        """Открывает на запись вход FFmpeg: его stdin или именованный канал. Открытие канала
+        ждёт, пока FFmpeg не откроет его на чтение.
+
+        :return: None, если FFmpeg завершился раньше.
+        :raises OSError: канал не открывается.
+        """
+        if '-' == input_path:
+            pipe = process.stdin
+        else:
+            while True:
+                try:
+                    # Блокирующий open завис бы навсегда, если FFmpeg упадёт раньше.
+                    fd = os.open(input_path, os.O_WRONLY | os.O_NONBLOCK)
+                    break
+                except OSError as error:
+                    if errno.ENXIO != error.errno:
+                        raise
+                if process.poll() is not None:
+                    return None
+                sleep(0.05)
+            os.set_blocking(fd, True)
+            pipe = os.fdopen(fd, 'wb')
+
+        cls._enlarge_pipe(pipe)
+        return pipe
+
+    PRESET_SAMPLE_FRAMES = 8
+    PRESET_ENCODED_FRAMES = 60
+    PRESET_HEADROOM = 1.2
+    """Во время сжатия рендеринг занимает одно ядро, поэтому кодировщику нужен запас."""
+
+    def calibrate_preset(self, view: FrameView, frames: Sequence[Frame], cache_path: Path):
+        """Выбирает самый медленный (лучше всего сжимающий) пресет кодировщика, который ещё
+        успевает за рендерингом, и дальше сжимает с ним (профиль ``auto``). Для этого рисует
+        несколько кадров, разбросанных по последовательности, и сжимает их в никуда с каждым
+        пресетом, от быстрых к медленным. Выбор запоминается в ``cache_path`` для этой машины,
+        кодировщика, разрешения и CRF. Если FFmpeg не смог сжать кадры ни с одним пресетом,
+        ничего не запоминается, и остаётся пресет профиля.
+
+        :raises ValueError: в FFmpeg нет нужного кодировщика.
+        """
+        codec = self._options.get_codec()
+        if self._options.draft or ('mjpeg-copy' == codec):
+            return
+        encoder = self._find_encoder(codec)
+        if encoder not in EncoderProfiles.PRESET_LADDERS:
+            print(f'{encoder} has no presets to choose from.\n', flush=True)
+            return
+        option, ladder = EncoderProfiles.PRESET_LADDERS[encoder]
+
+        key = self._get_preset_cache_key(encoder, view)
+        try:
+            cache = json.loads(cache_path.read_text(encoding='utf-8'))
+            assert isinstance(cache, dict)
+        except (OSError, ValueError, AssertionError):
+            cache = {}
+
+        preset = cache.get(key)
+        if preset in ladder:
+            print(f'Preset of {encoder}: {option} {preset} (cached)\n', flush=True)
+        else:
+            preset = self._measure_presets(view, frames, encoder, option, ladder)
+            if preset is None:
+                print(f'Calibration of {encoder} failed, the preset of the profile is kept.\n',
+                    flush=True)
+                return
+            cache[key] = preset
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                cache_path.write_text(json.dumps(cache, indent=2), encoding='utf-8')
+            except OSError:
+                pass  # Next time it will be measured again.
+
+        options = self._options.profiles.get(self._options.profile, encoder)
+        options[option] = preset
+        self._options.profiles.set(EncoderProfiles.AUTO, encoder, options)
+        self._options = replace(self._options, profile=EncoderProfiles.AUTO)
+
+    def _get_preset_cache_key(self, encoder: str, view: FrameView) -> str:
+        """Машина, кодировщик, разрешение, формат пикселей и CRF: от CRF скорость сжатия
+        зависит не меньше, чем от разрешения."""
+        codec_options = self._get_codec_options(resolution=view.resolution)
+        crf = codec_options[codec_options.index('-crf') + 1] if '-crf' in codec_options else '-'
+        return f'{platform.node()} {encoder} {view.resolution} {view.pix_fmt} crf {crf}'
+
+    def _measure_presets(self, view: FrameView, frames: Sequence[Frame],
+            encoder: str, option: str, ladder: Sequence[str]) -> Optional[str]:
+        """Пресет или None, если ни один пресет не удалось измерить."""
+        sample = Decimator.evenly([x for x in frames if not x.banner], self.PRESET_SAMPLE_FRAMES)
+        if not sample:
+            return None
+
+        rendered = []
+        start = monotonic()
+        for frame in sample:
+            buffer = io.BytesIO()
+            view.write(frame, buffer)
+            rendered.append(buffer.getvalue())
+        render_fps = len(sample) / max(monotonic() - start, 1e-6)
+        print(f'Rendering: {render_fps:.1f} fps', flush=True)
+
+        result = ladder[0]
+        measured = False
+        for preset in ladder:
+            encoder_fps = self._measure_encoder(view, rendered, {option: preset})
+            print(f'{encoder} {option} {preset}: {encoder_fps:.1f} fps', flush=True)
+            measured = measured or (encoder_fps > 0)
+            if encoder_fps < render_fps * self.PRESET_HEADROOM:
+                break
+            result = preset
+
+        if not measured:
+            return None
+        print(f'Preset of {encoder}: {option} {result}\n', flush=True)
+        return result
+
+    def _measure_encoder(self, view: FrameView, rendered: Sequence[bytes],
+            overrides: Dict[str, Union[str, int]]) -> float:
+        """Кадров в секунду. Ноль, если FFmpeg не справился. This function does not throw
+        exceptions.
+        """
+        ffmpeg_options = [
+            'ffmpeg', '-nostdin', '-hide_banner',
+            *view.get_input_options(self._options.frame_rate),
+            '-i', '-',
+            *[x for x in self._get_codec_options(overrides, view.resolution)
+                if not x.startswith('+faststart')],
+            '-f', 'null', '-'
         ]
+        if '-movflags' in ffmpeg_options:
+            ffmpeg_options.remove('-movflags')
+
+        start = monotonic()
+        try:
+            process = subprocess.Popen(ffmpeg_options, stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            assert process.stdin is not None
+            with process.stdin:
+                for index in range(self.PRESET_ENCODED_FRAMES):
+                    process.stdin.write(rendered[index % len(rendered)])
+            if process.wait():
+                return 0
+        except OSError:
+            return 0
+        return self.PRESET_ENCODED_FRAMES / max(monotonic() - start, 1e-6)
 
     def exit_threads(self):
         """To terminate all threads running in the main method in a controlled manner."""
@@ -1409,7 +3300,14 @@ class OutputProcessor:
             if not self._write_pixels_control.full():
                 self._write_pixels_control.put('stop', block=False)
 
-    def make(self, view: FrameView, frames: Sequence[Frame]):
+    def make(self, view: Union[FrameView, 'FilterGraph'], frames: Sequence[Frame],
+            on_frame: Optional[Callable[[Frame], None]] = None):
+        """Renders the frames and compresses them into the destination file.
+
+        :param view: With :class:`FilterGraph`, FFmpeg reads and renders the frames itself.
+        :param on_frame: Called in the rendering thread before each frame. It may raise
+            ValueError to abort compression; the error is then raised here.
+        """
 
         processed_frame_count = 0
         processed_per_cent = -1
@@ -1426,89 +3324,145 @@ class OutputProcessor:
             if last_processed < processed_per_cent:
                 print(f'Progress: {processed_per_cent}%', flush=True)
 
-        ffmpeg_options = [
-            'ffmpeg', '-f', 'rawvideo', '-c:v', 'rawvideo', '-pix_fmt', 'rgb24',
-            '-s', str(view.resolution),
-            '-r', str(self._options.frame_rate),
-            '-i', '-'
-        ]
+        graph = view if isinstance(view, FilterGraph) else None
 
-        suffix = self._options.destination.suffix
-        if suffix == '.mp4':
-            ffmpeg_options.extend(self._get_h264_options())
-        elif suffix == '.webm':
-            ffmpeg_options.extend(self._get_vp9_options())
-        else:
-            raise ValueError('Unsupported file name suffix.')
+        work_folder: Optional[tempfile.TemporaryDirectory] = None
+        input_path = '-'
+        if graph or ('fifo' == self._options.transport):
+            work_folder = tempfile.TemporaryDirectory(prefix='catframes-')
 
-        ffmpeg_options.extend([
-            '-r', str(self._options.frame_rate),
-            ('-y' if self._options.overwrite else '-n'),
-            str(self._options.destination.expanduser())
-        ])
+        if graph:
+            assert work_folder is not None
+            input_path = os.path.join(work_folder.name, 'frames.txt')
+            with open(input_path, 'w', encoding='utf-8') as concat_list:
+                concat_list.write(graph.get_concat_list())
 
-        set_processed(0)
+            ffmpeg_options = [
+                'ffmpeg', '-nostdin',
+                '-reinit_filter', '0', '-f', 'concat', '-safe', '0',
+                '-i', input_path
+            ]
+        else:
+            if work_folder:
+                input_path = os.path.join(work_folder.name, 'frames.rgb')
+                os.mkfifo(input_path, 0o600)
+
+            ffmpeg_options = [
+                'ffmpeg', *(['-nostdin'] if work_folder else []),
+                *view.get_input_options(self._options.frame_rate),
+                '-i', input_path
+            ]
+        ffmpeg_options.extend(self._get_output_options(view.resolution,
+            graph.get_filter() if graph else 'null'))
 
-        with tempfile.TemporaryDirectory() as logs_path_string:
-            logs_path = Path(logs_path_string)
+        set_processed(0)
 
-            errors_path = logs_path / 'error.txt'
-            catched = None
+        process = subprocess.Popen(ffmpeg_options,
+            stdin=(subprocess.DEVNULL if work_folder else subprocess.PIPE),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT
+        )
 
-            process = subprocess.Popen(ffmpeg_options,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT
-            )
+        # Всё, чего ждёт главный поток: номера отправленных кадров и конец вывода FFmpeg.
+        events: Queue = Queue()
+        write_thread_errors: List[ValueError] = []
 
-            write_thread_messages: Queue = Queue(maxsize = 10)
+        # Хвост вывода FFmpeg, чтобы показать его, если что-то пойдёт не так.
+        output_tail: deque = deque(maxlen=self.OUTPUT_TAIL_CHUNKS)
 
-            def write_pixels(items, control_queue, pipe, progress_queue):
-                def poll_for_exit_comand():
-                    while not control_queue.empty():
-                        control_message = control_queue.get_nowait()
-                        if 'stop' == control_message:
-                            return True
-                    return False
-
-                for index in range(len(items)):
-                    item = items[index]
+        def write_pixels(items, control_queue, input_path):
+            try:
+                pipe = self._open_input(process, input_path)
+            except OSError:
+                process.kill()
+                raise
+            if pipe is None:
+                return  # FFmpeg has exited, its output explains why.
+
+            def poll_for_exit_comand():
+                while not control_queue.empty():
+                    control_message = control_queue.get_nowait()
+                    if 'stop' == control_message:
+                        return True
+                return False
+
+            for index in range(len(items)):
+                item = items[index]
+
+                must_stop = poll_for_exit_comand()
+                if must_stop:
+                    break
+
+                if on_frame:
+                    try:
+                        on_frame(item)
+                    except ValueError as error:
+                        # A truncated video must not look like a complete one.
+                        write_thread_errors.append(error)
+                        process.kill()
+                        break
 
-                    must_stop = poll_for_exit_comand()
+                try:
+                    view.write(item, pipe)
+                except BrokenPipeError:
+                    break  # FFmpeg has exited, its output explains why.
+                except:
                     if must_stop:
                         break
+                    elif poll_for_exit_comand():
+                        break
+                    else:
+                        # Иначе FFmpeg вечно ждал бы остаток кадра.
+                        process.kill()
+                        raise
 
-                    try:
-                        pipe.write(view.apply(item))
-                    except:
-                        if must_stop:
-                            break
-                        elif poll_for_exit_comand():
-                            break
-                        else:
-                            raise
-
-                    if not progress_queue.full():
-                        progress_queue.put(1 + index, block=False)
+                events.put(1 + index)
 
+            try:
                 pipe.close()
-
-            input_thread = threading.Thread(
-                target=write_pixels,
-                args=[
-                    frames,
-                    self._write_pixels_control,
-                    process.stdin,
-                    write_thread_messages
-                ],
-                daemon=False
-            )
-
+            except OSError:
+                pass  # FFmpeg has been killed.
+
+        def read_output(pipe):
+            # Модуль selectors не работает с каналами в Windows, поэтому отдельный поток.
+            chunk = pipe.read1(self.OUTPUT_CHUNK_SIZE)
+            while chunk:
+                output_tail.append(chunk)
+                if graph:
+                    # Кадры рисует сам FFmpeg, о них говорит его строка статистики.
+                    counts = re.findall(rb'frame=\s*(\d+)', chunk)
+                    if counts:
+                        events.put(int(counts[-1]))
+                chunk = pipe.read1(self.OUTPUT_CHUNK_SIZE)
+            events.put(None)
+
+        input_thread = threading.Thread(
+            target=write_pixels,
+            args=[
+                frames,
+                self._write_pixels_control,
+                input_path
+            ],
+            daemon=False
+        )
+        output_thread = threading.Thread(target=read_output, args=[process.stdout], daemon=True)
+
+        if not graph:
             input_thread.start()
+        output_thread.start()
+
+        with process.stdout:
+            output_is_over = False
+            while not output_is_over:
+                try:
+                    # Миниатюры появляются не чаще, чем раз в 0.2 секунды.
+                    message = events.get(timeout=0.2)
+                except Empty:
+                    message = 0
 
-            def read_write_thread_messages():
-                while not write_thread_messages.empty():
-                    message = write_thread_messages.get_nowait()
+                while True:
+                    if message is None:
+                        output_is_over = True
 
                     # The second condition guarantees that 100% will not fall out here.
                     # The fact is that this queue shows which frame was sent for compression,
@@ -1517,38 +3471,118 @@ class OutputProcessor:
                     # copied before FFmpeg finishes working, we will get a broken file.
                     # Encoding 10 seconds or more after sending the last frame to FFmpeg
                     # has been empirically confirmed.
-                    if (int == type(message)) and (message < len(frames)):
+                    elif (message > processed_frame_count) and (message < len(frames)):
                         set_processed(message)
 
-            with process.stdout:
-                ret_code = process.poll()
-                while None == ret_code:
-                    read_write_thread_messages()
-                    chunk = process.stdout.read(32)
+                    if events.empty():
+                        break
+                    message = events.get_nowait()
 
-                    if self._options.live_preview and not view.thumbnail.empty():
-                        print('Preview: ' + view.thumbnail.get_nowait(), flush=True)
+                if graph:
+                    if not self._write_pixels_control.empty():
+                        self._write_pixels_control.get_nowait()
+                        process.terminate()  # FFmpeg finishes the file on SIGTERM.
+                elif self._options.live_preview and not view.thumbnail.empty():
+                    print('Preview: ' + view.thumbnail.get_nowait(), flush=True)
 
-                    # I want this code to work in Python 3.7.
-                    # The operator := requires 3.8.
-                    ret_code = process.poll()
+            ret_code = process.wait()
+            output_thread.join()
 
-                print(f'FFmpeg exited with {ret_code}.', flush=True)
+        print(f'FFmpeg exited with {ret_code}.', flush=True)
 
-                if 0 == ret_code:
-                    set_processed(len(frames))
-                else:
-                    sys.exit(15) # == F(Fmpeg)
+        if work_folder:
+            if not graph:
+                input_thread.join()
+            work_folder.cleanup()
 
+        if write_thread_errors:
             input_thread.join()
+            raise write_thread_errors[0]
+
+        if 0 == ret_code:
+            set_processed(len(frames))
+        else:
+            print(self._get_output_tail(output_tail), file=sys.stderr, flush=True)
+            sys.exit(15) # == F(Fmpeg)
+
+        if not graph:
+            input_thread.join()
+
+    def _get_output_options(self, resolution: Resolution, input_filter: str) -> List[str]:
+        """Фильтры и опции всех видео, включая дополнительные.
+
+        :param resolution: Разрешение кадров на входе FFmpeg.
+        :param input_filter: Фильтр для всех видео, ``null``, если его нет.
+        """
+        outputs = [self, *self._also]
+        output_filters = [
+            'crop={}:{}:{}:{}'.format(*x._options.area) if x._options.area else 'null'
+            for x in outputs
+        ]
+
+        result: List[str] = []
+        if len(outputs) > 1:
+            # Each output would have its own copy of a simple filter graph.
+            result.extend(['-filter_complex', ';'.join([
+                f'[0:v]{input_filter},split={len(outputs)}' +
+                ''.join(f'[in{i}]' for i in range(len(outputs))),
+                *[f'[in{i}]{x}[out{i}]' for i, x in enumerate(output_filters)]
+            ])])
+        elif ('null' != input_filter) or ('null' != output_filters[0]):
+            result.extend(['-vf', ','.join(
+                x for x in (input_filter, output_filters[0]) if 'null' != x)])
+
+        for index, output in enumerate(outputs):
+            if len(outputs) > 1:
+                result.extend(['-map', f'[out{index}]'])
+            area = output._options.area
+            result.extend(output._get_codec_options(
+                resolution=(Resolution(area[0], area[1]) if area else resolution)))
+            result.extend([
+                '-r', str(self._options.frame_rate),
+                ('-y' if output._options.overwrite else '-n'),
+                str(output._options.destination.expanduser())
+            ])
+        return result
+
+    @classmethod
+    def _get_output_tail(cls, chunks: Iterable[bytes]) -> str:
+        """Последние строки вывода FFmpeg. Строка статистики FFmpeg обновляется
+        возвратом каретки, её промежуточные состояния отбрасываются.
+        """
+        text = b''.join(chunks).decode('utf-8', errors='replace')
+        lines = [x.split('\r')[-1].rstrip() for x in text.split('\n')]
+        return '\n'.join([x for x in lines if x][-cls.OUTPUT_TAIL_LINES:])
 
 
 class PillowFrameView(FrameView):
     """For guaranteed single-threaded rendering by the Pillow library. This allows you
     to use the same canvas multiple times without loading heap and GC.
+
+    :param pix_fmt: ``rgb24`` or planar YUV (``yuv444p``, ``yuv422p``, ``yuv420p``) to write.
     """
-    def __init__(self, resolution: Resolution):
+    YUV_SUBSAMPLING: Dict[str, Tuple[int, int]] = {
+        'yuv444p': (1, 1),
+        'yuv422p': (2, 1),
+        'yuv420p': (2, 2),
+    }
+
+    # Pillow converts to YCbCr as JPEG does, in the full range. The encoders expect
+    # the limited one (BT.601), just as FFmpeg converts RGB by default.
+    LUMA_LUT = [16 + round(x * 219 / 255) for x in range(256)]
+    CHROMA_LUT = [16 + round(x * 224 / 255) for x in range(256)]
+
+    @classmethod
+    def get_richest_pix_fmt(cls, pix_fmts: Iterable[str]) -> str:
+        """The YUV format with the least chroma subsampling, so that frames rendered once
+        lose no colour in any of the videos made from them."""
+        return min(pix_fmts, key=lambda x: cls.YUV_SUBSAMPLING[x][0] * cls.YUV_SUBSAMPLING[x][1])
+
+    def __init__(self, resolution: Resolution, pix_fmt: str = 'rgb24'):
         super().__init__(resolution)
+        if ('rgb24' != pix_fmt) and (pix_fmt not in self.YUV_SUBSAMPLING):
+            raise ValueError(f'Unsupported pixel format: {pix_fmt}')
+        self.pix_fmt = pix_fmt
 
         self._lock = threading.Lock()
 
@@ -1572,20 +3606,99 @@ class PillowFrameView(FrameView):
         thumbnail.save(result, 'JPEG', quality=95, subsampling=0)
         return base64.b64encode(result.getvalue()).decode('utf-8')
 
+    def _render_canvas(self, frame: Frame):
+        """For use with self._lock only!"""
+        self._render(frame)
+        assert self._image.size[0] == self.resolution.width
+        assert self._image.size[1] == self.resolution.height
+
+        subtle_delay: float = 0.2
+        it_is_time = (monotonic() - self._thumbnail_time) >= subtle_delay
+        if it_is_time and not self.thumbnail.full():
+            b64_thumbnail = self._make_jpeg_base64_thumbnail()
+            self.thumbnail.put(b64_thumbnail, block=False)
+            self._thumbnail_time = monotonic()
+
     def apply(self, frame: Frame) -> bytes:
         with self._lock:
-            self._render(frame)
-            assert self._image.size[0] == self.resolution.width
-            assert self._image.size[1] == self.resolution.height
+            self._render_canvas(frame)
+            return self._image.tobytes()
 
-            subtle_delay: float = 0.2
-            it_is_time = (monotonic() - self._thumbnail_time) >= subtle_delay
-            if it_is_time and not self.thumbnail.full():
-                b64_thumbnail = self._make_jpeg_base64_thumbnail()
-                self.thumbnail.put(b64_thumbnail, block=False)
-                self._thumbnail_time = monotonic()
+    PIPE_CHUNK_SIZE = 262144
 
-            return self._image.tobytes()
+    def write(self, frame: Frame, pipe: BinaryIO):
+        with self._lock:
+            self._render_canvas(frame)
+            if 'rgb24' == self.pix_fmt:
+                self._write_image(self._image, pipe)
+            else:
+                for plane in self._make_yuv_planes():
+                    self._write_image(plane, pipe)
+
+    def _make_yuv_planes(self) -> Sequence[Image.Image]:
+        """For use with self._lock only! Планы Y, U, V для :attr:`pix_fmt`. Цветность
+        усредняется по блокам 2×1 или 2×2, как в :data:`YUV_SUBSAMPLING`.
+        """
+        luma, blue, red = self._image.convert('YCbCr').split()
+
+        x_step, y_step = self.YUV_SUBSAMPLING[self.pix_fmt]
+        if (x_step, y_step) != (1, 1):
+            # Нечётная сторона округляется вверх, как в FFmpeg.
+            size = -(-self._image.width // x_step), -(-self._image.height // y_step)
+            blue = blue.resize(size, Image.Resampling.BOX)
+            red = red.resize(size, Image.Resampling.BOX)
+
+        return luma.point(self.LUMA_LUT), blue.point(self.CHROMA_LUT), red.point(self.CHROMA_LUT)
+
+    _raw_encoder_works: Optional[bool] = None
+    """Whether the internal raw encoder API of this Pillow writes what ``tobytes`` returns,
+    see :meth:`_has_raw_encoder`."""
+
+    @classmethod
+    def _has_raw_encoder(cls) -> bool:
+        """Checks once that Pillow's internal raw encoder is present and writes the same bytes
+        as :meth:`PIL.Image.Image.tobytes` into a file descriptor. This function does not throw
+        exceptions.
+        """
+        if cls._raw_encoder_works is None:
+            try:
+                works = True
+                with tempfile.TemporaryFile() as file:
+                    for mode in 'RGB', 'L':
+                        image = Image.linear_gradient('L').resize((7, 5)).convert(mode)
+                        file.seek(0)
+                        file.truncate()
+                        encoder = Image._getencoder(mode, 'raw', (mode, 0, 1))
+                        encoder.setimage(image.im, (0, 0) + image.size)
+                        status = encoder.encode_to_file(file.fileno(), cls.PIPE_CHUNK_SIZE)
+                        file.seek(0)
+                        works = works and (status >= 0) and (file.read() == image.tobytes())
+                cls._raw_encoder_works = works
+            except Exception:
+                cls._raw_encoder_works = False
+        return cls._raw_encoder_works
+
+    @classmethod
+    def _write_image(cls, image: Image.Image, pipe: BinaryIO):
+        """Pillow's raw encoder writes the image into the pipe descriptor in chunks straight
+        from the image memory (releasing the GIL), so no bytes object of the whole frame
+        is allocated and copied. Without a working raw encoder the bytes are copied.
+        """
+        try:
+            fd = pipe.fileno() if cls._has_raw_encoder() else None
+        except (OSError, io.UnsupportedOperation):
+            fd = None
+        if fd is None:
+            # Not a real pipe or a Pillow without this internal API.
+            pipe.write(image.tobytes())
+            return
+
+        encoder = Image._getencoder(image.mode, 'raw', (image.mode, 0, 1))
+        encoder.setimage(image.im, (0, 0) + image.size)
+        pipe.flush()
+        status = encoder.encode_to_file(fd, cls.PIPE_CHUNK_SIZE)
+        if status < 0:
+            raise OSError(f'Raw encoder error {status}.')
 
     @abstractmethod
     def _render(self, frame: Frame):
@@ -1599,8 +3712,32 @@ class PillowFrameView(FrameView):
         size = (self.resolution.width, self.resolution.height)
         self._draw.rectangle([(0, 0), size], fill=color)
 
-    def _paste(self, source: Image.Image):
-        """Вписывает отмасштабированную картинку по центру поверх текущего содержимого."""
+    @staticmethod
+    def _to_native_mode(source: Image.Image) -> Image.Image:
+        """Приводит картинку к одному из режимов, с которыми без лишних преобразований работают
+        масштабирование и вставка на холст: RGB, RGBA или L. Преобразование выполняется один
+        раз, до масштабирования (палитру нельзя масштабировать иначе, чем по ближайшему соседу).
+        """
+        mode = source.mode
+        if mode in ('RGB', 'RGBA', 'L'):
+            return source
+        if mode in ('LA', 'La', 'PA', 'RGBa'):
+            return source.convert('RGBA')
+        if mode == 'P':
+            return source.convert('RGBA' if 'transparency' in source.info else 'RGB')
+        if mode.startswith('I;16'):
+            # Общее преобразование обрезало бы всё, что ярче 255.
+            return source.convert('I').point(lambda x: x * (1 / 256)).convert('L')
+        if mode in ('1', 'I', 'F'):
+            return source.convert('L')
+        return source.convert('RGB')
+
+    def _paste(self, source: Image.Image, background):
+        """Вписывает отмасштабированную картинку по центру холста. Поля и то, что видно сквозь
+        прозрачные участки, заливаются цветом ``background`` (кортеж RGB). Если картинка
+        непрозрачна, заливаются только поля, а если она закрывает весь холст — ничего.
+        """
+        source = self._to_native_mode(source)
 
         source_resolution = Resolution(*source.size)
         scale_size = ResolutionUtils.get_scale_size(
@@ -1626,11 +3763,29 @@ class PillowFrameView(FrameView):
             (self.resolution.width - scaled.size[0]) // 2,
             (self.resolution.height - scaled.size[1]) // 2)
 
+        alpha = None
         if scaled.mode == 'RGBA':
+            # Отмасштабированный альфа-канал не больше холста, проверить его дёшево.
             alpha = scaled.getchannel(3)
+            if alpha.getextrema()[0] == 255:
+                alpha = None
+                scaled = scaled.convert('RGB')
+
+        if alpha:
+            self._clear(background)
             self._image.paste(scaled, position, mask=alpha)
-        else:
-            self._image.paste(scaled, position)
+            return
+
+        width, height = self.resolution.width, self.resolution.height
+        left, top = position
+        right, bottom = left + scaled.size[0], top + scaled.size[1]
+        margins = (0, 0, width, top), (0, bottom, width, height), \
+            (0, top, left, bottom), (right, top, width, bottom)
+        for box in margins:
+            if (box[2] > box[0]) and (box[3] > box[1]):
+                self._image.paste(background, box)
+
+        self._image.paste(scaled, position)
 
     def _find_font(self, size: int) -> ImageFont.FreeTypeFont:
         """Ищет в системе что-нибудь из популярных юникодных моноширинных TrueType-шрифтов.
@@ -1689,7 +3844,13 @@ class OverlayModel:
     mtime: Union[datetime, None]
     """Местное время последнего изменения файла на текущий момент.
 
-    Не заполняется, если файла не оказалось на диске.
+    Не заполняется, если файла не оказалось на диске.
+    """
+
+    exif_time: Union[datetime, None]
+    """Местное время съёмки из EXIF, прочитанное при изучении кадра (см. :meth:`Frame.probe`).
+
+    Не заполняется, если в файле нет такой отметки.
     """
 
     size: Union[int, None]
@@ -1781,19 +3942,182 @@ class DefaultFrameView(PillowFrameView):
     LINE_HEIGHT: int = 16
     TEXT_STROKE_WIDTH: int = 2
 
-    def __init__(self, resolution: Resolution, margin_color: str, layout: Layout):
-        super().__init__(resolution)
+    def __init__(self, resolution: Resolution, margin_color: str, layout: Layout,
+            draft: bool = False, max_source_pixels: Optional[int] = None,
+            frame_timeout: Optional[float] = None, pix_fmt: str = 'rgb24'):
+        super().__init__(resolution, pix_fmt)
         self.overlay_font = self._find_font(self.FONT_SIZE)
         self.margin_color = ImageColor.getrgb(margin_color)
         self.layout = layout
 
+        self.draft = draft
+        """Разрешить декодерам (JPEG) читать картинку сразу в уменьшенном виде."""
+
+        self.frame_timeout = frame_timeout
+        """Сколько секунд можно читать одну исходную картинку. Иначе будет показан кадр
+        с ошибкой ``TimeoutError``.
+        """
+
+        self._worker_lock = threading.Lock()
+        self._worker_tasks: Optional[Queue] = None
+        """Очередь рабочего потока, который читает картинки, пока он не завис."""
+        self._abandoned_count = 0
+        """Сколько зависших рабочих потоков ещё не вернулось."""
+        self._hung_sources: Set[FrameSource] = set()
+        """Архивы, в которых зависло чтение. Оно держит блокировку архива."""
+
+        self.max_source_pixels = max_source_pixels
+        """Сколько пикселей исходной картинки можно декодировать. JPEG побольше читается сразу
+        в уменьшенном виде, остальное показывается как кадр с ошибкой. Без ограничения
+        действует защита Pillow от «бомб» (:data:`PIL.Image.MAX_IMAGE_PIXELS`).
+        """
+
         self.vtime = datetime.now()
         self.machine = platform.machine()
         self.network_name = platform.node()
         self.message_text_wrapper = textwrap.TextWrapper(width=70)
 
+    def _load(self, frame: Frame, loaded: Dict[str, Union[Image.Image, OverlayModel]]):
+        """Читает и декодирует исходную картинку. Результаты складываются в ``loaded`` по мере
+        готовности: ``overlay_model``, затем ``source``.
+
+        :raises OSError: файл не читается.
+        :raises PIL.Image.DecompressionBombError: картинка слишком большая.
+        """
+        with frame.open() as binary:
+            source = Image.open(binary)
+            loaded['overlay_model'] = self._make_overlay_model(frame, source.size)
+            self._reduce_source(source)
+            source.load()
+        loaded['source'] = source
+
+    def _load_in_time(self, frame: Frame,
+            loaded: Dict[str, Union[Image.Image, OverlayModel]]) -> Image.Image:
+        """То же, что :meth:`_load`, но если задан :attr:`frame_timeout`, чтение идёт
+        в рабочем потоке (см. :meth:`_run_in_time`).
+
+        :raises TimeoutError: картинка не прочитана вовремя.
+        """
+        if self.frame_timeout:
+            self._run_in_time(frame, lambda: self._load(frame, loaded))
+        else:
+            self._load(frame, loaded)
+        return loaded['source']
+
+    def probe_in_time(self, frame: Frame):
+        """:meth:`Frame.probe` с ограничением :attr:`frame_timeout`. Если время вышло, кадр
+        остаётся неизученным, а чтение картинки при рендеринге закончится кадром с ошибкой.
+        This function does not throw exceptions.
+        """
+        if frame.banner or frame.probed:
+            return
+        if not self.frame_timeout:
+            frame.probe()
+            return
+        try:
+            self._run_in_time(frame, frame.probe)
+        except TimeoutError:
+            pass
+
+    MAX_ABANDONED_THREADS = 4
+    """Сколько зависших чтений может висеть одновременно. Дальше картинки не читаются, пока
+    какое-нибудь из них не вернётся, а кадры сразу показывают ошибку."""
+
+    def _run_in_time(self, frame: Frame, function: Callable[[], None]):
+        """Выполняет чтение кадра в рабочем потоке. Если время вышло, поток бросается: зависшее
+        чтение (сетевой диск, патологический файл) так и остаётся висеть, а для следующих
+        кадров запускается новый поток. Архив с зависшим чтением не читается, пока оно
+        не вернётся.
+
+        :raises TimeoutError: время вышло или чтение невозможно.
+        """
+        with self._worker_lock:
+            if frame.source in self._hung_sources:
+                raise TimeoutError(f'{frame.path}: the archive is still being read')
+            if self._worker_tasks is None:
+                if self._abandoned_count >= self.MAX_ABANDONED_THREADS:
+                    raise TimeoutError(f'{frame.path}: too many reads hang')
+                self._worker_tasks = Queue()
+                threading.Thread(target=self._work, args=[self._worker_tasks],
+                    daemon=True).start()
+            tasks = self._worker_tasks
+
+        results: Queue = Queue(maxsize=1)
+        tasks.put((function, frame.source, results))
+        try:
+            error = results.get(timeout=self.frame_timeout)
+        except Empty:
+            with self._worker_lock:
+                if results.empty():
+                    self._worker_tasks = None
+                    self._abandoned_count += 1
+                    if frame.source:
+                        self._hung_sources.add(frame.source)
+                    print(f'Timeout: {frame.path}', flush=True)
+                    raise TimeoutError(
+                        f'{frame.path}: no image in {self.frame_timeout} s') from None
+            error = results.get_nowait()
+
+        if error:
+            raise error
+
+    def _work(self, tasks: Queue):
+        while True:
+            function, source, results = tasks.get()
+            try:
+                function()
+                results.put(None)
+            except BaseException as error:
+                results.put(error)
+
+            with self._worker_lock:
+                if tasks is not self._worker_tasks:
+                    # Брошен, пока читал.
+                    self._abandoned_count -= 1
+                    self._hung_sources.discard(source)
+                    return
+
+    def _reduce_source(self, source: Image.Image):
+        """Просит декодер (JPEG) сразу уменьшить картинку в 2, 4 или 8 раз, если она больше
+        холста в черновом режиме или больше :attr:`max_source_pixels`. Вызывается до загрузки
+        пикселей.
+
+        :raises PIL.Image.DecompressionBombError: картинка не укладывается в ограничение
+            даже после уменьшения.
+        """
+        width, height = source.size
+        goal = (width, height)
+        if self.draft:
+            goal = (min(width, self.resolution.width), min(height, self.resolution.height))
+
+        limit = self.max_source_pixels
+        if limit and (width * height > limit):
+            for scale in 2, 4, 8:
+                if math.ceil(width / scale) * math.ceil(height / scale) <= limit:
+                    break
+            goal = (
+                min(goal[0], math.ceil(width / scale)),
+                min(goal[1], math.ceil(height / scale)))
+
+        if goal != (width, height):
+            source.draft(source.mode, goal)
+
+        if limit and (source.width * source.height > limit):
+            raise Image.DecompressionBombError(f'{width}x{height} > {limit} pixels')
+
     def _make_overlay_model(self, frame: Frame, source_size: Tuple[int, int]) -> OverlayModel:
-        file_checksum = FileUtils.get_checksum(frame.path)
+        if frame.source:
+            # Только что прочитанный член архива повторно не читается.
+            file_checksum = frame.source.get_checksum(frame.member)
+            symlink = False
+            mtime = frame.source.get_mtime(frame.member)
+            size = frame.source.get_size(frame.member)
+        else:
+            file_checksum = FileUtils.get_checksum(frame.path)
+            symlink = FileUtils.is_symlink(frame.path)
+            mtime = FileUtils.get_mtime(frame.path)
+            size = FileUtils.get_file_size(frame.path)
+
         if file_checksum == frame.checksum:
             warning = ''
         elif file_checksum == None:
@@ -1805,9 +4129,10 @@ class DefaultFrameView(PillowFrameView):
             warning=warning,
             filename=frame.name,
             foldername=frame.folder,
-            symlink=FileUtils.is_symlink(frame.path),
-            mtime=FileUtils.get_mtime(frame.path),
-            size=FileUtils.get_file_size(frame.path),
+            symlink=symlink,
+            mtime=mtime,
+            exif_time=frame.exif_time,
+            size=size,
             resolution=Resolution(source_size[0], source_size[1]),
             numdir=frame.numdir,
             numvideo=frame.numvideo,
@@ -1872,120 +4197,736 @@ class DefaultFrameView(PillowFrameView):
         return '\n'.join(self.message_text_wrapper.wrap(text))
 
     def _render(self, frame: Frame):
-        overlay_model: Union[OverlayModel, None] = None
-
         if frame.banner:
-            self._clear(self.ERROR_BG)
-            self._draw_multiline(
-                1, 1,
-                self._wrap(frame.message),
-                lambda _: self.ERROR_BG,
-                lambda _: self.ERROR_TEXT)
+            self._render_banner(frame)
             return
 
+        overlay_model = self._compose(frame)
+        if overlay_model:
+            self._draw_overlays(overlay_model)
+
+    def _render_banner(self, frame: Frame):
+        self._clear(self.ERROR_BG)
+        self._draw_multiline(
+            1, 1,
+            self._wrap(frame.message),
+            lambda _: self.ERROR_BG,
+            lambda _: self.ERROR_TEXT)
+
+    def _compose(self, frame: Frame) -> Optional[OverlayModel]:
+        """Рисует картинку кадра (или кадр с ошибкой) без оверлеев.
+
+        :return: Данные для оверлеев, если файл удалось открыть.
+        """
+        overlay_model: Union[OverlayModel, None] = None
+
         # (frame.path is None) == frame.banner
         assert frame.path is not None
 
+        loaded: Dict[str, Union[Image.Image, OverlayModel]] = {}
         try:
-            with Image.open(frame.path) as source:
-                overlay_model = self._make_overlay_model(frame, source.size)
-                self._clear(self.margin_color)
-                self._paste(source)
-        except OSError as image_open_error:
+            try:
+                source = self._load_in_time(frame, loaded)
+            finally:
+                overlay_model = loaded.get('overlay_model')
+            self._paste(source, self.margin_color)
+        except (OSError, Image.DecompressionBombError) as image_open_error:
             self._clear(self.ERROR_BG)
             self._draw_multiline(
                 1, 1,
                 self._wrap(f'{frame.folder}/{frame.name}\n{image_open_error.__class__.__name__}'),
                 lambda _: self.ERROR_BG,
                 lambda _: self.ERROR_TEXT)
+        return overlay_model
 
-        if overlay_model:
-            thumbnail_size = \
-                math.ceil(self.resolution.width / self.LINE_HEIGHT), \
-                math.ceil(self.resolution.height / self.LINE_HEIGHT)
-
-            thumbnail = self._image.resize(
-                thumbnail_size,
-                resample=Image.Resampling.BICUBIC,
-                reducing_gap=2.0)
-
-            bg_rgb = thumbnail.convert('RGB').load()
-            bg_brightness = thumbnail.convert('L').load()
-
-            def get_text_stroke_color(line_position):
-                bg_x = min(thumbnail_size[0]-1, line_position[0] // self.LINE_HEIGHT)
-                bg_y = min(thumbnail_size[1]-1, line_position[1] // self.LINE_HEIGHT)
-                return bg_rgb[bg_x, bg_y]
-
-            def get_text_fill_color(line_position):
-                bg_x = min(thumbnail_size[0]-1, line_position[0] // self.LINE_HEIGHT)
-                bg_y = min(thumbnail_size[1]-1, line_position[1] // self.LINE_HEIGHT)
-                return '#fff' if bg_brightness[bg_x, bg_y] < 127 else '#000'
-
-            for xpos, ypos in itertools.product(range(3), range(3)):
-                if xpos == ypos == 1:
-                    continue
+    def _draw_overlays(self, overlay_model: OverlayModel):
+        """Подписывает то, что уже нарисовано на холсте, цветами под его фон."""
+        thumbnail_size = \
+            math.ceil(self.resolution.width / self.LINE_HEIGHT), \
+            math.ceil(self.resolution.height / self.LINE_HEIGHT)
+
+        thumbnail = self._image.resize(
+            thumbnail_size,
+            resample=Image.Resampling.BICUBIC,
+            reducing_gap=2.0)
+
+        bg_rgb = thumbnail.convert('RGB').load()
+        bg_brightness = thumbnail.convert('L').load()
+
+        def get_text_stroke_color(line_position):
+            bg_x = min(thumbnail_size[0]-1, line_position[0] // self.LINE_HEIGHT)
+            bg_y = min(thumbnail_size[1]-1, line_position[1] // self.LINE_HEIGHT)
+            return bg_rgb[bg_x, bg_y]
+
+        def get_text_fill_color(line_position):
+            bg_x = min(thumbnail_size[0]-1, line_position[0] // self.LINE_HEIGHT)
+            bg_y = min(thumbnail_size[1]-1, line_position[1] // self.LINE_HEIGHT)
+            return '#fff' if bg_brightness[bg_x, bg_y] < 127 else '#000'
+
+        for xpos, ypos in itertools.product(range(3), range(3)):
+            if xpos == ypos == 1:
+                continue
+
+            template = self.layout.get(xpos, ypos)
+            if template:
+                self._draw_multiline(
+                    xpos, ypos,
+                    template(overlay_model),
+                    get_text_stroke_color,
+                    get_text_fill_color)
+
+
+class _DefaultFrameViewTest(TestCase):
+    def test_alpha_blending(self):
+        """Цвет полей должен быть также цветом фона."""
+        margin_color_string = '#ffff00'
+        margin_color = ImageColor.getrgb(margin_color_string)
+        image_color = ImageColor.getrgb('#00f')
+
+        view = DefaultFrameView(Resolution(640, 480), margin_color_string, Layout())
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+
+            non_transparent_path = folder_path / '1.jpg'
+            non_transparent = Image.new("RGB", (400, 480), image_color)
+            non_transparent.save(non_transparent_path)
+
+            transparent_path = folder_path / '2.png'
+            transparent = Image.new("RGBA", (400, 480))
+            draw = ImageDraw.Draw(transparent)
+            draw.ellipse([(100, 140), (300, 340)], fill=image_color)
+            transparent.save(transparent_path)
+
+            response_1: bytes = view.apply(Frame(non_transparent_path))
+            response_2: bytes = view.apply(Frame(transparent_path))
+
+        from_rgb_src = Image.frombytes(
+            mode='RGB',
+            size=(view.resolution.width, view.resolution.height),
+            data=response_1).load()
+
+        from_rgba_src = Image.frombytes(
+            mode='RGB',
+            size=(view.resolution.width, view.resolution.height),
+            data=response_2).load()
+
+        def assert_close(rgb_a, rgb_b, threshold=10):
+            msg = f'{rgb_a} != {rgb_b}'
+            self.assertTrue(abs(rgb_a[0] - rgb_b[0]) < threshold, msg)
+            self.assertTrue(abs(rgb_a[1] - rgb_b[1]) < threshold, msg)
+            self.assertTrue(abs(rgb_a[2] - rgb_b[2]) < threshold, msg)
+
+        assert_close(margin_color, from_rgb_src[0, 0])
+        assert_close(margin_color, from_rgba_src[0, 0])
+
+        assert_close(margin_color, from_rgb_src[119, 0])
+        assert_close(margin_color, from_rgba_src[119, 0])
+
+        assert_close(image_color, from_rgb_src[120, 0])
+        assert_close(margin_color, from_rgba_src[120, 0])
+        assert_close(image_color, from_rgba_src[320, 240])
+
+    def test_paste_modes(self):
+        """Прозрачность палитры и LA учитывается, 16 бит не обрезаются, а непрозрачная
+        картинка во весь холст не требует заливки."""
+        view = DefaultFrameView(Resolution(64, 48), '#ff0', Layout())
+        background = ImageColor.getrgb('#ff0')
+
+        def paste(source: Image.Image) -> Image.Image:
+            view._clear('#f00')
+            view._paste(source, background)
+            return view._image
+
+        palette = Image.new('P', (32, 48), 1)
+        palette.putpalette([0, 0, 0, 0, 0, 255])
+        palette.info['transparency'] = 1
+        self.assertEqual(background, paste(palette).getpixel((32, 24)))
+        self.assertEqual(background, paste(palette).getpixel((0, 0)))
+
+        transparent = Image.new('LA', (64, 48), (0, 0))
+        self.assertEqual(background, paste(transparent).getpixel((32, 24)))
+        white = Image.new('I;16', (64, 48), 65535)
+        self.assertEqual((255, 255, 255), paste(white).getpixel((0, 0)))
+
+        opaque = paste(Image.new('RGBA', (128, 96), (0, 0, 255, 255)))
+        self.assertEqual(((0, 0), (0, 0), (255, 255)), opaque.getextrema())
+
+        narrow = paste(Image.new('RGB', (32, 48), (0, 0, 255)))
+        self.assertEqual(background, narrow.getpixel((0, 0)))
+        self.assertEqual(background, narrow.getpixel((63, 47)))
+        self.assertEqual((0, 0, 255), narrow.getpixel((32, 24)))
+
+    def test_frame_timeout(self):
+        """Зависшее чтение заменяется кадром с ошибкой, следующий кадр рисуется как обычно."""
+        class SlowSource(FrameSource):
+            def __init__(self, path: Path):
+                super().__init__(path)
+                self._members['1.png'] = (None, 0)
+
+            def _read(self, name: str) -> bytes:
+                sleep(1)
+                return b''
+
+        view = DefaultFrameView(Resolution(64, 48), '#000', Layout(), frame_timeout=0.1)
+
+        def get_center(frame: Frame):
+            return Image.frombytes('RGB', (64, 48), view.apply(frame)).getpixel((32, 24))
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            path = Path(folder_path_string) / '1.png'
+            Image.new("RGB", (64, 48), '#00f').save(path)
+
+            start = monotonic()
+            slow_source = SlowSource(path.parent)
+            slow_frame = Frame(path, probe=False, source=slow_source, member='1.png')
+            self.assertEqual(DefaultFrameView.ERROR_BG, get_center(slow_frame))
+            self.assertLess(monotonic() - start, 0.9)
+            self.assertEqual((0, 0, 255), get_center(Frame(path)))
+
+            # Архив занят зависшим чтением: его кадры не ждут.
+            start = monotonic()
+            view.probe_in_time(Frame(path, probe=False, source=slow_source, member='1.png'))
+            self.assertEqual(DefaultFrameView.ERROR_BG, get_center(slow_frame))
+            self.assertLess(monotonic() - start, 0.1)
+
+            sleep(1.2)  # Зависшее чтение вернулось, брошенных потоков нет.
+            self.assertEqual(0, view._abandoned_count)
+            self.assertFalse(view._hung_sources)
+
+            # Один рабочий поток на все кадры.
+            thread_count = threading.active_count()
+            for _ in range(5):
+                self.assertEqual((0, 0, 255), get_center(Frame(path)))
+            self.assertEqual(thread_count, threading.active_count())
+
+    def test_probe_timeout(self):
+        """Кадр, не изученный вовремя, остаётся неизученным, и его можно изучить снова."""
+        class SlowOnceSource(FrameSource):
+            def __init__(self, path: Path, data: bytes):
+                super().__init__(path)
+                self._members['1.png'] = (None, len(data))
+                self._data = data
+                self._slow = True
+
+            def read(self, name: str) -> bytes:
+                if self._slow:
+                    self._slow = False
+                    sleep(0.5)
+                return self._data
+
+            def _read(self, name: str) -> bytes:
+                return self._data
+
+        view = DefaultFrameView(Resolution(64, 48), '#000', Layout(), frame_timeout=0.1)
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            path = Path(folder_path_string) / '1.png'
+            Image.new("RGB", (64, 48), '#00f').save(path)
+            source = SlowOnceSource(path.parent, path.read_bytes())
+            frame = Frame(path, probe=False, source=source, member='1.png')
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                view.probe_in_time(frame)
+            self.assertFalse(frame.probed)
+
+            frame.probe()
+            self.assertTrue(frame.probed)
+            self.assertEqual(FileUtils.get_checksum(path), frame.checksum)
+            self.assertEqual(str(Resolution(64, 48)), str(frame.resolution))
+            sleep(0.6)  # Зависшее чтение возвращается.
+
+    def test_write(self):
+        """В канал и в файловый объект без дескриптора пишутся те же байты, что отдаёт apply."""
+        view = DefaultFrameView(Resolution(640, 480), '#ff0', Layout())
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            path = Path(folder_path_string) / '1.png'
+            Image.new("RGB", (320, 480), '#00f').save(path)
+            frame = Frame(path)
+            expected = view.apply(frame)
+
+            buffer = io.BytesIO()
+            view.write(frame, buffer)
+            self.assertEqual(expected, buffer.getvalue())
+
+            read_fd, write_fd = os.pipe()
+            received = bytearray()
+
+            def read():
+                with os.fdopen(read_fd, 'rb') as reading_pipe:
+                    received.extend(reading_pipe.read())
+
+            reader = threading.Thread(target=read)
+            reader.start()
+            with os.fdopen(write_fd, 'wb') as pipe:
+                view.write(frame, pipe)
+            reader.join()
+            self.assertEqual(expected, bytes(received))
+            self.assertTrue(PillowFrameView._has_raw_encoder())
+
+            # Без внутреннего API Pillow байты копируются.
+            self.addCleanup(setattr, PillowFrameView, '_raw_encoder_works',
+                PillowFrameView._raw_encoder_works)
+            PillowFrameView._raw_encoder_works = False
+            with tempfile.TemporaryFile() as file:
+                view.write(frame, file)
+                file.seek(0)
+                self.assertEqual(expected, file.read())
+
+    def test_write_yuv(self):
+        """Цветность прорежена по формату, диапазон ограниченный, как у FFmpeg."""
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            path = Path(folder_path_string) / '1.png'
+            Image.new("RGB", (31, 17), '#fff').save(path)
+
+            for pix_fmt, chroma_size in ('yuv444p', 31*17), ('yuv422p', 16*17), ('yuv420p', 16*9):
+                view = DefaultFrameView(Resolution(31, 17), '#000', Layout(), pix_fmt=pix_fmt)
+                buffer = io.BytesIO()
+                view.write(Frame(path), buffer)
+                data = buffer.getvalue()
+
+                self.assertEqual(31*17 + 2*chroma_size, len(data), pix_fmt)
+                self.assertEqual({235}, set(data[:31*17]))
+                self.assertEqual({128}, set(data[31*17:]))
+
+        with self.assertRaises(ValueError):
+            DefaultFrameView(Resolution(32, 18), '#000', Layout(), pix_fmt='nv12')
+
+    def test_richest_pix_fmt(self):
+        """Для нескольких видео кадры рисуются в формате самого качественного из них."""
+        self.assertEqual('yuv420p', PillowFrameView.get_richest_pix_fmt(['yuv420p']))
+        self.assertEqual('yuv444p',
+            PillowFrameView.get_richest_pix_fmt(['yuv420p', 'yuv444p', 'yuv422p']))
+
+    def test_max_source_pixels(self):
+        """JPEG читается уменьшенным, остальное становится кадром с ошибкой."""
+        view = DefaultFrameView(Resolution(640, 480), '#000', Layout(),
+            max_source_pixels=640*480)
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            Image.new("RGB", (2560, 1920), '#0f0').save(folder_path / '1.jpg')
+            Image.new("RGB", (2560, 1920), '#0f0').save(folder_path / '2.png')
+
+            with Image.open(folder_path / '1.jpg') as source:
+                view._reduce_source(source)
+                self.assertEqual((640, 480), source.size)
+
+            with Image.open(folder_path / '2.png') as source:
+                with self.assertRaises(Image.DecompressionBombError):
+                    view._reduce_source(source)
+
+            def get_center(path: Path):
+                response = view.apply(Frame(path))
+                return Image.frombytes('RGB', (640, 480), response).getpixel((320, 240))
+
+            self.assertGreater(get_center(folder_path / '1.jpg')[1], 240)
+            self.assertEqual(DefaultFrameView.ERROR_BG, get_center(folder_path / '2.png'))
+
+
+class FilterGraph:
+    """То же, что нарисовал бы :class:`DefaultFrameView`, но картинки читает, масштабирует
+    и подписывает сам FFmpeg, в своих потоках. Файлы перечисляются для демультиплексора
+    concat, а текст оверлеев вычисляется заранее и передаётся с каждым кадром в метаданных,
+    откуда его берёт фильтр drawtext.
+
+    Отличия от :class:`DefaultFrameView`: предупреждения (``WARN``) пусты, ведь чек-суммы
+    не сверяются; текст белый с чёрной обводкой, а не подобранный под фон; нечитаемый файл
+    останавливает сжатие, а не превращается в кадр с ошибкой.
+
+    :raises ValueError: кадры или настройки не подходят (причина в сообщении,
+        см. :meth:`get_obstacle`).
+    """
+    FORMATS = '.jpg', '.jpeg'
+    """Concat требует одного кодека для всех файлов. К тому же у JPEG нет прозрачности."""
+
+    METADATA_PREFIX = 'catframes'
+
+    _has_drawtext: Optional[bool] = None
+
+    def __init__(self, view: 'DefaultFrameView', frames: Sequence[Frame], frame_rate: int):
+        obstacle = self.get_obstacle(view, frames)
+        if obstacle:
+            raise ValueError(obstacle)
+
+        self.view = view
+        self.resolution = view.resolution
+        self._frames = frames
+        self._frame_rate = frame_rate
+
+        self._lines: List[Dict[Tuple[int, int], List[str]]] = \
+            [self._get_lines(x) for x in frames] if len(view.layout) else []
+        """Строки оверлеев каждого кадра по ячейкам."""
+
+        self._line_counts: Dict[Tuple[int, int], int] = {}
+        """Наибольшее число строк в каждой ячейке, по фильтру drawtext на строку."""
+        for cells in self._lines:
+            for cell, lines in cells.items():
+                self._line_counts[cell] = max(len(lines), self._line_counts.get(cell, 0))
+
+    @classmethod
+    def get_obstacle(cls, view: 'DefaultFrameView', frames: Sequence[Frame]) -> Optional[str]:
+        """Почему FFmpeg не справится сам. None, если справится."""
+        if any(x.banner for x in frames):
+            return 'there are banner frames'
+        if any(x.source for x in frames):
+            return 'frames are read from archives'
+        if not all(x.name.lower().endswith(cls.FORMATS) for x in frames):
+            return 'not all frames are JPEG'
+        if view.frame_timeout or view.max_source_pixels:
+            return 'source images are limited'
+        if len(view.layout) and not cls._check_drawtext():
+            return 'FFmpeg has no drawtext filter'
+        return None
+
+    @classmethod
+    def _check_drawtext(cls) -> bool:
+        """This function does not throw exceptions."""
+        if cls._has_drawtext is None:
+            try:
+                filters = subprocess.run(['ffmpeg', '-hide_banner', '-filters'],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+                cls._has_drawtext = bool(re.search(rb'\sdrawtext\s', filters))
+            except OSError:
+                cls._has_drawtext = False
+        return cls._has_drawtext
+
+    def _get_lines(self, frame: Frame) -> Dict[Tuple[int, int], List[str]]:
+        frame.probe()
+        model = OverlayModel(
+            warning='',
+            filename=frame.name,
+            foldername=frame.folder,
+            symlink=FileUtils.is_symlink(frame.path),
+            mtime=FileUtils.get_mtime(frame.path),
+            exif_time=frame.exif_time,
+            size=FileUtils.get_file_size(frame.path),
+            resolution=frame.resolution,
+            numdir=frame.numdir,
+            numvideo=frame.numvideo,
+            vtime=self.view.vtime,
+            machine=self.view.machine,
+            node=self.view.network_name)
 
-                template = self.layout.get(xpos, ypos)
-                if template:
-                    self._draw_multiline(
-                        xpos, ypos,
-                        template(overlay_model),
-                        get_text_stroke_color,
-                        get_text_fill_color)
+        result = {}
+        for xpos, ypos in itertools.product(range(3), range(3)):
+            if xpos == ypos == 1:
+                continue
+            template = self.view.layout.get(xpos, ypos)
+            if template:
+                result[(xpos, ypos)] = template(model).split('\n')
+        return result
 
+    def get_concat_list(self) -> str:
+        """Список файлов для демультиплексора concat."""
+        def quote(text: str) -> str:
+            return "'" + text.replace("'", "'\\''") + "'"
+
+        result = ['ffconcat version 1.0']
+        for index, frame in enumerate(self._frames):
+            assert frame.path is not None
+            result.append('file ' + quote(str(frame.path.expanduser().absolute())))
+            for (xpos, ypos), lines in (self._lines[index].items() if self._lines else ()):
+                for line_index, line in enumerate(lines):
+                    key = f'{self.METADATA_PREFIX}.{xpos}{ypos}.{line_index}'
+                    result.append(f'file_packet_meta {key} {quote(line)}')
+        return '\n'.join(result) + '\n'
+
+    def get_filter(self) -> str:
+        """Граф фильтров. Без переинициализации графа (``-reinit_filter 0``) номера кадров
+        не сбиваются, когда меняется разрешение картинок.
+        """
+        width, height = self.resolution.width, self.resolution.height
+        color = '0x{:02x}{:02x}{:02x}'.format(*self.view.margin_color)
+        result = [
+            f'setpts=N/({self._frame_rate}*TB)',
+            f'scale={width}:{height}:force_original_aspect_ratio=decrease:flags=lanczos' +
+                ':eval=frame',
+            f'pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color={color}:eval=frame',
+        ]
+        for (xpos, ypos), count in self._line_counts.items():
+            for line_index in range(count):
+                result.append(self._get_drawtext(xpos, ypos, line_index, count))
+        return ','.join(result)
+
+    def _get_drawtext(self, xpos: int, ypos: int, line_index: int, total_lines: int) -> str:
+        line_height = self.view.LINE_HEIGHT
+        x = ('2', '(w-text_w)/2', 'w-3-text_w')[xpos]
+        if ypos == 0:
+            y = str(line_index * line_height)
+        elif ypos == 2:
+            y = f'h-2-{(total_lines - line_index) * line_height}'
+        else:
+            offset = (line_index - total_lines // 2) * line_height
+            if total_lines % 2 == 0:
+                offset += line_height // 2
+            y = f'h/2-{line_height // 2 - offset}'
+
+        key = f'{self.METADATA_PREFIX}.{xpos}{ypos}.{line_index}'
+        options = [
+            ('fontfile', self.view.overlay_font.path),
+            ('fontsize', self.view.FONT_SIZE),
+            ('fontcolor', 'white'),
+            ('borderw', self.view.TEXT_STROKE_WIDTH),
+            ('bordercolor', 'black'),
+            ('x', x),
+            ('y', y),
+            ('text', f'%{{metadata:{key}}}'),
+        ]
+        return 'drawtext=' + ':'.join(f'{k}={self._escape(str(v))}' for k, v in options)
 
-class _DefaultFrameViewTest(TestCase):
-    def test_alpha_blending(self):
-        """Цвет полей должен быть также цветом фона."""
-        margin_color_string = '#ffff00'
-        margin_color = ImageColor.getrgb(margin_color_string)
-        image_color = ImageColor.getrgb('#00f')
+    @staticmethod
+    def _escape(value: str) -> str:
+        """Экранирует значение опции фильтра на обоих уровнях разбора графа."""
+        value = re.sub(r"([\\':])", r'\\\1', value)
+        return re.sub(r"([\\'\[\],;])", r'\\\1', value)
+
+
+class _FilterGraphTest(TestCase):
+    def _make_view(self, layout: Layout) -> 'DefaultFrameView':
+        return DefaultFrameView(Resolution(64, 48), '#f80', layout)
+
+    def test_obstacles(self):
+        frames = [Frame(Path('a/1.jpg'), probe=False), Frame(Path('a/2.JPEG'), probe=False)]
+        view = self._make_view(Layout())
+        self.assertIsNone(FilterGraph.get_obstacle(view, frames))
+
+        for bad in Frame(Path('a/3.png'), probe=False), Frame(None, True, 'Message'):
+            with self.assertRaises(ValueError):
+                FilterGraph(view, frames + [bad], 30)
+
+    def test_overlays(self):
+        """Текст каждого кадра попадает в его метаданные, строки — в отдельные фильтры."""
+        layout = Layout()
+        layout.put(0, 2, OverLang.compile("{fn}\\nit's {frame:video}"))
+        view = self._make_view(layout)
+        self.addCleanup(setattr, FilterGraph, '_has_drawtext', FilterGraph._has_drawtext)
+        FilterGraph._has_drawtext = True
+
+        frames = [Frame(Path('a/1.jpg'), probe=False), Frame(Path('a/2.jpg'), probe=False)]
+        for index, frame in enumerate(frames):
+            frame.numvideo = 1 + index
+        graph = FilterGraph(view, frames, 30)
+
+        concat_list = graph.get_concat_list().split('\n')
+        self.assertEqual("file_packet_meta catframes.02.0 '2.jpg'", concat_list[5])
+        self.assertEqual("file_packet_meta catframes.02.1 'it'\\''s 2'", concat_list[6])
+
+        filters = graph.get_filter().split(',drawtext=')
+        self.assertEqual(3, len(filters))
+        self.assertIn('pad=64:48:(ow-iw)/2:(oh-ih)/2:color=0xff8800', filters[0])
+        self.assertIn('text=%{metadata\\\\:catframes.02.1}', filters[2])
+
+    def test_escape(self):
+        self.assertEqual("C\\\\:\\\\\\\\f\\\\\\'x\\[1\\]\\,", FilterGraph._escape("C:\\f'x[1],"))
+
+
+class JpegCopyView(FrameView):
+    """Для ``--codec=mjpeg-copy``: файлы JPEG идут в FFmpeg как есть, без декодирования
+    и повторного сжатия. Остальные кадры рисует ``view``, а этот класс сжимает их в JPEG
+    с той же цветовой субдискретизацией.
+
+    Файл копируется, если это непрогрессивный JPEG в YCbCr точно в разрешении видео,
+    с субдискретизацией как у первого кадра, и его чек-сумма не изменилась. Оверлеи на такие
+    кадры не наносятся, поэтому с оверлеями, кроме ``WARN``, нужно ``copy=False``.
+
+    :param quality: Качество сжатия кадров, которые не удалось скопировать, и субдискретизация,
+        если первый кадр — не JPEG.
+    :param copy: Копировать подходящие файлы. Иначе все кадры рисуются.
+    """
+    SUBSAMPLING = {'yuv444p': 0, 'yuv422p': 1, 'yuv420p': 2}
+    """Значения :func:`PIL.JpegImagePlugin.get_sampling` для форматов FFmpeg."""
+
+    def __init__(self, view: 'DefaultFrameView', frames: Sequence[Frame], quality: Quality,
+            copy: bool = True):
+        super().__init__(view.resolution)
+        self.view = view
+        self.thumbnail = view.thumbnail
+        self.jpeg_quality = quality.get_jpeg_quality()
+        self.copy = copy
+
+        self.subsampling = self.SUBSAMPLING[quality.get_pix_fmt()]
+        """Одна на весь поток, иначе не все плееры его покажут."""
+        first = next((x for x in frames if not x.banner), None)
+        if first:
+            try:
+                with first.open() as binary, Image.open(binary) as image:
+                    if ('JPEG' == image.format) and ('RGB' == image.mode):
+                        self.subsampling = JpegImagePlugin.get_sampling(image)
+            except (OSError, Image.DecompressionBombError):
+                pass
+            if self.subsampling not in self.SUBSAMPLING.values():
+                self.subsampling = self.SUBSAMPLING[quality.get_pix_fmt()]
 
-        view = DefaultFrameView(Resolution(640, 480), margin_color_string, Layout())
+        self.copied_count = 0
+        """Сколько файлов скопировано как есть."""
 
-        with tempfile.TemporaryDirectory() as folder_path_string:
-            folder_path = Path(folder_path_string)
+    def get_input_options(self, frame_rate: int) -> List[str]:
+        return ['-f', 'image2pipe', '-c:v', 'mjpeg', '-framerate', str(frame_rate)]
 
-            non_transparent_path = folder_path / '1.jpg'
-            non_transparent = Image.new("RGB", (400, 480), image_color)
-            non_transparent.save(non_transparent_path)
+    def apply(self, frame: Frame) -> bytes:
+        return self.view.apply(frame)
+
+    def write(self, frame: Frame, pipe: BinaryIO):
+        data = self._read_copyable(frame)
+        if data is None:
+            size = self.resolution.width, self.resolution.height
+            image = Image.frombytes('RGB', size, self.view.apply(frame))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=self.jpeg_quality, subsampling=self.subsampling)
+            data = buffer.getvalue()
+        else:
+            self.copied_count += 1
+        pipe.write(data)
 
-            transparent_path = folder_path / '2.png'
-            transparent = Image.new("RGBA", (400, 480))
-            draw = ImageDraw.Draw(transparent)
-            draw.ellipse([(100, 140), (300, 340)], fill=image_color)
-            transparent.save(transparent_path)
+    def _read_copyable(self, frame: Frame) -> Optional[bytes]:
+        """Содержимое файла, если его можно скопировать. This function does not throw
+        exceptions: unreadable files are left to :attr:`view`.
+        """
+        if frame.banner or not self.copy:
+            return None
 
-            response_1: bytes = view.apply(Frame(non_transparent_path))
-            response_2: bytes = view.apply(Frame(transparent_path))
+        try:
+            with frame.open() as binary:
+                data = binary.read()
+            if FileUtils.get_stream_checksum(io.BytesIO(data)) != frame.checksum:
+                return None  # The view will show the warning.
+
+            with Image.open(io.BytesIO(data)) as image:
+                if ('JPEG' != image.format) or ('RGB' != image.mode):
+                    return None
+                if image.size != (self.resolution.width, self.resolution.height):
+                    return None
+                if image.info.get('progressive') or image.info.get('progression'):
+                    return None
+                if JpegImagePlugin.get_sampling(image) != self.subsampling:
+                    return None
+        except (OSError, Image.DecompressionBombError):
+            return None
 
-        from_rgb_src = Image.frombytes(
-            mode='RGB',
-            size=(view.resolution.width, view.resolution.height),
-            data=response_1).load()
+        return data
 
-        from_rgba_src = Image.frombytes(
-            mode='RGB',
-            size=(view.resolution.width, view.resolution.height),
-            data=response_2).load()
 
-        def assert_close(rgb_a, rgb_b, threshold=10):
-            msg = f'{rgb_a} != {rgb_b}'
-            self.assertTrue(abs(rgb_a[0] - rgb_b[0]) < threshold, msg)
-            self.assertTrue(abs(rgb_a[1] - rgb_b[1]) < threshold, msg)
-            self.assertTrue(abs(rgb_a[2] - rgb_b[2]) < threshold, msg)
+class _JpegCopyViewTest(TestCase):
+    def test_write(self):
+        """Подходящий JPEG копируется байт в байт, остальные кадры сжимаются заново."""
+        view = DefaultFrameView(Resolution(64, 48), '#000', Layout())
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            folder_path = Path(folder_path_string)
+            Image.new('RGB', (64, 48), '#00f').save(folder_path / '1.jpg', subsampling=1)
+            Image.new('RGB', (64, 48), '#00f').save(folder_path / '2.jpg', subsampling=2)
+            Image.new('RGB', (64, 48), '#00f').save(folder_path / '3.jpg', progressive=True,
+                subsampling=1)
+            Image.new('RGB', (32, 48), '#00f').save(folder_path / '4.jpg', subsampling=1)
+            Image.new('RGB', (64, 48), '#00f').save(folder_path / '5.png')
+
+            frames = [Frame(folder_path / x) for x in ('1.jpg', '2.jpg', '3.jpg', '4.jpg', '5.png')]
+            copy_view = JpegCopyView(view, frames, Quality.POOR)
+            self.assertEqual(1, copy_view.subsampling)
+
+            for frame in frames:
+                buffer = io.BytesIO()
+                copy_view.write(frame, buffer)
+                with Image.open(buffer) as image:
+                    self.assertEqual('JPEG', image.format)
+                    self.assertEqual((64, 48), image.size)
+                    self.assertEqual(1, JpegImagePlugin.get_sampling(image))
+
+            self.assertEqual(1, copy_view.copied_count)
+            buffer = io.BytesIO()
+            copy_view.write(frames[0], buffer)
+            self.assertEqual((folder_path / '1.jpg').read_bytes(), buffer.getvalue())
+
+            (folder_path / '1.jpg').write_bytes((folder_path / '2.jpg').read_bytes())
+            copy_view.write(frames[0], io.BytesIO())
+            self.assertEqual(2, copy_view.copied_count)
+
+
+class LadderFrameView(PillowFrameView):
+    """Один кадр в нескольких разрешениях («лестница» для веб-плееров). Картинка читается
+    и вписывается один раз, в самом большом разрешении, а каждая следующая ступень уменьшается
+    из предыдущей. Оверлеи рисуются на каждой ступени отдельно, её шрифтом и по её фону.
+
+    Ступени лежат на холсте одна под другой, каждая у левого края, и FFmpeg получает их
+    одним кадром. Чтобы вырезать ступень, см. :meth:`get_areas`.
+
+    :param views: Ступени от самой большой к самой маленькой, с одной пропорцией.
+    """
+    def __init__(self, views: Sequence[DefaultFrameView], pix_fmt: str = 'rgb24'):
+        assert views
+        self._views = views
+
+        self._offsets: List[int] = []
+        """Верхний край каждой ступени. Чётный, иначе в yuv420p ступень не вырезать."""
+        height = 0
+        for view in views:
+            self._offsets.append(height)
+            height += view.resolution.height + view.resolution.height % 2
+        super().__init__(Resolution(views[0].resolution.width, height), pix_fmt)
+
+        for view in views[1:]:
+            view.vtime = views[0].vtime
+
+    def get_areas(self) -> List[Tuple[int, int, int, int]]:
+        """Ширина, высота, x и y каждой ступени на холсте."""
+        return [
+            (view.resolution.width, view.resolution.height, 0, offset)
+            for view, offset in zip(self._views, self._offsets)
+        ]
 
-        assert_close(margin_color, from_rgb_src[0, 0])
-        assert_close(margin_color, from_rgba_src[0, 0])
+    def _make_jpeg_base64_thumbnail(self) -> str:
+        """For use with self._lock only! Миниатюра самой большой ступени."""
+        with self._views[0]._lock:
+            return self._views[0]._make_jpeg_base64_thumbnail()
 
-        assert_close(margin_color, from_rgb_src[119, 0])
-        assert_close(margin_color, from_rgba_src[119, 0])
+    @staticmethod
+    def _reduce(image: Image.Image, resolution: Resolution) -> Image.Image:
+        factor = image.width // resolution.width
+        if (image.width, image.height) == (resolution.width * factor, resolution.height * factor):
+            return image.reduce(factor)
+        return image.resize((resolution.width, resolution.height), Image.Resampling.LANCZOS,
+            reducing_gap=3.0)
 
-        assert_close(image_color, from_rgb_src[120, 0])
-        assert_close(margin_color, from_rgba_src[120, 0])
-        assert_close(image_color, from_rgba_src[320, 240])
+    def _render(self, frame: Frame):
+        if frame.banner:
+            for view in self._views:
+                view._render_banner(frame)
+        else:
+            overlay_model = self._views[0]._compose(frame)
+            for previous, view in zip(self._views, self._views[1:]):
+                view._image.paste(self._reduce(previous._image, view.resolution))
+            if overlay_model:
+                for view in self._views:
+                    view._draw_overlays(overlay_model)
+
+        for view, offset in zip(self._views, self._offsets):
+            self._image.paste(view._image, (0, offset))
+
+
+class _LadderFrameViewTest(TestCase):
+    def test_render(self):
+        """Ступени уменьшаются из одной картинки, у каждой свои оверлеи."""
+        layout = Layout()
+        layout.put(0, 0, OverLang.compile('{fn}'))
+        views = [
+            DefaultFrameView(Resolution(*x), '#000', layout)
+            for x in ((640, 480), (320, 240), (212, 158))
+        ]
+        ladder = LadderFrameView(views)
+        self.assertEqual(Resolution(640, 878), ladder.resolution)
+        self.assertEqual([(640, 480, 0, 0), (320, 240, 0, 480), (212, 158, 0, 720)],
+            ladder.get_areas())
+
+        with tempfile.TemporaryDirectory() as folder_path_string:
+            path = Path(folder_path_string) / 'frame.png'
+            Image.new('RGB', (1280, 960), '#00f').save(path)
+            image = Image.frombytes('RGB', (640, 878), ladder.apply(Frame(path)))
 
+        for width, height, x, y in ladder.get_areas():
+            area = image.crop((x, y, x + width, y + height))
+            self.assertEqual((0, 0, 255), area.getpixel((width // 2, height // 2)))
+            # Имя файла написано в левом верхнем углу каждой ступени.
+            self.assertNotEqual((0, 0, 255), area.getpixel((5, 5)))
+        self.assertEqual((0, 0, 0), image.getpixel((300, 800)))
 
 
 class OverLang:
@@ -2039,6 +4980,10 @@ class OverLang:
                                 :py:meth:`datetime.datetime.strftime`. Если не указывать,
                                 используется ISO 8601 с миллисекундами.
 
+        ``{exif[:формат]}``     Местное время съёмки из EXIF (DateTimeOriginal). Пустая строка,
+                                если в файле нет такой отметки. Формат — как у ``mtime``, но по
+                                умолчанию используется ISO 8601 с точностью до секунд.
+
         ``{size}``              Размер кадра на диске в байтах.
         ``{resolution}``        Исходное разрешение кадра.
         ``{symlink[:вид]}``     Отметка о том, что кадр является симлинком или пустая строка.
@@ -2146,6 +5091,11 @@ class OverLang:
                 cls._check_datetime_format(config)
                 return lambda x: x.mtime.strftime(config) if x.mtime else ''
             return lambda x: x.mtime.isoformat(timespec='milliseconds') if x.mtime else ''
+        elif func == 'exif':
+            if config:
+                cls._check_datetime_format(config)
+                return lambda x: x.exif_time.strftime(config) if x.exif_time else ''
+            return lambda x: x.exif_time.isoformat(timespec='seconds') if x.exif_time else ''
         elif func == 'size':
             return lambda x: str(x.size)
         elif func == 'resolution':
@@ -2199,12 +5149,14 @@ class _OverLangTest(TestCase):
     @staticmethod
     def _get_overlay_mockup(symlink: bool = False, with_mtime = True) -> OverlayModel:
         modified = datetime(2022, 9, 7, 0, 1, 23, 123000) if with_mtime else None
+        captured = datetime(2022, 9, 6, 23, 59, 1) if with_mtime else None
         return OverlayModel(
             warning='Что-то не так\nс кадром example.jpg...',
             filename='example.jpg',
             foldername='some_folder',
             symlink=symlink,
             mtime=modified,
+            exif_time=captured,
             size=1234567,
             resolution=Resolution(640, 480),
             numdir=55,
@@ -2365,6 +5317,16 @@ class _OverLangTest(TestCase):
         self._check_overlay(model, 'mtime', '')
         self._check_overlay(model, 'mtime:%d.%m.%Y %H:%M:%S', '')
 
+    def test_exif(self):
+        """Стандартный формат — с точностью до секунд."""
+        model = self._get_overlay_mockup()
+        self._check_overlay(model, 'exif', '2022-09-06T23:59:01')
+        self._check_overlay(model, 'exif:%d.%m.%Y', '06.09.2022')
+
+        model = self._get_overlay_mockup(with_mtime = False)
+        self._check_overlay(model, 'exif', '')
+        self._check_overlay(model, 'exif:%d.%m.%Y', '')
+
     def test_size(self):
         """Просто приводит к строке значение из модели."""
         model = self._get_overlay_mockup()
@@ -2544,13 +5506,227 @@ class _EnumeratorTest(TestCase):
             self.assertEqual(300, last_real_frame.numvideo)
 
 
+class Decimator:
+    """Модуль прореживания последовательности кадров. Кадры-заглушки не прореживаются,
+    а нумерация оставшихся кадров не меняется.
+    """
+
+    @staticmethod
+    def every(frames: Sequence[Frame], step: int) -> List[Frame]:
+        """Оставляет каждый step-й кадр, начиная с первого."""
+        assert step > 0
+        result = []
+        index = 0
+        for frame in frames:
+            if frame.banner:
+                result.append(frame)
+                continue
+            if index % step == 0:
+                result.append(frame)
+            index += 1
+        return result
+
+    @staticmethod
+    def evenly(frames: Sequence[Frame], count: int) -> List[Frame]:
+        """Оставляет не больше count кадров, равномерно взятых из всей последовательности."""
+        assert count > 0
+        total = Enumerator.count(frames)
+        if total <= count:
+            return list(frames)
+
+        result = []
+        index = 0
+        next_kept = 0
+        for frame in frames:
+            if frame.banner:
+                result.append(frame)
+                continue
+            if index == next_kept * total // count:
+                result.append(frame)
+                next_kept += 1
+            index += 1
+        return result
+
+
+class _DecimatorTest(TestCase):
+    @staticmethod
+    def _make_frames(count: int) -> List[Frame]:
+        frames = [Frame(Path(f'{i}.jpg'), probe=False) for i in range(count)]
+        Enumerator.enumerate([frames])
+        return frames
+
+    def test_every(self):
+        frames = self._make_frames(100)
+        self.assertEqual(frames, Decimator.every(frames, 1))
+
+        result = Decimator.every(frames, 7)
+        self.assertEqual(frames[::7], result)
+        self.assertEqual([1 + 7*i for i in range(15)], [x.numvideo for x in result])
+        self.assertFalse(any(x.probed for x in frames))
+
+    def test_evenly(self):
+        frames = self._make_frames(100)
+        self.assertEqual(frames, Decimator.evenly(frames, 100))
+        self.assertEqual(frames, Decimator.evenly(frames, 1000))
+        self.assertEqual(frames[::4], Decimator.evenly(frames, 25))
+
+        result = Decimator.evenly(frames, 30)
+        self.assertEqual(30, len(result))
+        self.assertIs(frames[0], result[0])
+        self.assertEqual(len(result), len(set(map(id, result))))
+
+    def test_banners(self):
+        """Заглушки остаются все, без учёта в количестве."""
+        banner = Frame(None, True, 'Message')
+        frames = [banner] * 10 + self._make_frames(100) + [banner] * 10
+
+        result = Decimator.every(frames, 10)
+        self.assertEqual(30, len(result))
+        self.assertEqual(10, Enumerator.count(result))
+
+        result = Decimator.evenly(frames, 5)
+        self.assertEqual(25, len(result))
+        self.assertEqual(5, Enumerator.count(result))
+
+
+class FrameRange:
+    """Отрезок последовательности кадров. Границы включаются в отрезок и могут быть заданы
+    номером кадра в видео (см. :attr:`Frame.numvideo`), именем файла или местным временем
+    изменения файла в формате ISO 8601. Время со смещением от UTC переводится в местное.
+
+    :raises ValueError: граница задана неправильно.
+    """
+    __slots__ = '_start', '_end'
+
+    def __init__(self, start: Optional[str] = None, end: Optional[str] = None):
+        self._start = self._parse(start)
+        self._end = self._parse(end)
+
+    @staticmethod
+    def _parse(text: Optional[str]) -> Union[int, datetime, str, None]:
+        if text is None:
+            return None
+        text = text.strip()
+        if not text:
+            raise ValueError('Empty frame range bound.')
+        if text.isdigit():
+            return int(text)
+        try:
+            bound = datetime.fromisoformat(text)
+        except ValueError:
+            return text
+        if bound.tzinfo is not None:
+            # Время изменения файлов — местное и без часового пояса.
+            bound = bound.astimezone().replace(tzinfo=None)
+        return bound
+
+    def __bool__(self):
+        return (self._start is not None) or (self._end is not None)
+
+    @property
+    def needs_mtime(self) -> bool:
+        """Нужно ли заполнить :attr:`Frame.mtime` перед выбором кадров."""
+        return isinstance(self._start, datetime) or isinstance(self._end, datetime)
+
+    def select(self, frames: Sequence[Frame]) -> List[Frame]:
+        """Оставляет кадры из отрезка. Кадры-заглушки остаются, если находятся между
+        выбранными кадрами. Файлы не читаются.
+
+        :raises ValueError: в последовательности нет файла с указанным именем.
+        """
+        real = [i for i, x in enumerate(frames) if not x.banner]
+
+        def find_name(name: str, last: bool) -> int:
+            indices = reversed(real) if last else real
+            found = next((i for i in indices if frames[i].name == name), None)
+            if found is None:
+                raise ValueError(f'There is no frame named "{name}".')
+            return found
+
+        first_index = find_name(self._start, False) if isinstance(self._start, str) else 0
+        last_index = find_name(self._end, True) if isinstance(self._end, str) \
+            else len(frames) - 1
+
+        def inside(frame: Frame) -> bool:
+            for bound, sign in (self._start, 1), (self._end, -1):
+                if isinstance(bound, int):
+                    if sign * (frame.numvideo - bound) < 0:
+                        return False
+                elif isinstance(bound, datetime):
+                    if (frame.mtime is None) or (sign * (frame.mtime - bound).total_seconds() < 0):
+                        return False
+            return True
+
+        selected = [i for i in real if (first_index <= i <= last_index) and inside(frames[i])]
+        if not selected:
+            return []
+
+        return [x for i, x in enumerate(frames)
+            if (selected[0] <= i <= selected[-1]) and (x.banner or inside(x))]
+
+
+class _FrameRangeTest(TestCase):
+    @staticmethod
+    def _make_frames(count: int) -> List[Frame]:
+        frames = [Frame(Path(f'{i}.jpg'), probe=False) for i in range(1, count+1)]
+        Enumerator.enumerate([frames])
+        for frame in frames:
+            frame.mtime = datetime(2024, 1, 1) + timedelta(hours=frame.numvideo)
+        return frames
+
+    def test_empty(self):
+        frames = self._make_frames(10)
+        self.assertFalse(FrameRange())
+        self.assertEqual(frames, FrameRange().select(frames))
+
+    def test_numbers(self):
+        frames = self._make_frames(10)
+        self.assertEqual(frames[2:6], FrameRange('3', '6').select(frames))
+        self.assertEqual(frames[2:], FrameRange('3').select(frames))
+        self.assertEqual(frames[:6], FrameRange(end='6').select(frames))
+        self.assertEqual([], FrameRange('7', '6').select(frames))
+
+    def test_names(self):
+        frames = self._make_frames(10)
+        self.assertEqual(frames[2:6], FrameRange('3.jpg', '6.jpg').select(frames))
+        self.assertEqual(frames[2:6], FrameRange('3.jpg', '6').select(frames))
+        with self.assertRaises(ValueError):
+            FrameRange('11.jpg').select(frames)
+
+    def test_mtime(self):
+        frames = self._make_frames(10)
+        frame_range = FrameRange('2024-01-01T03:00', '2024-01-01 06:30')
+        self.assertTrue(frame_range.needs_mtime)
+        self.assertEqual(frames[2:6], frame_range.select(frames))
+        self.assertFalse(any(x.probed for x in frames))
+
+        frames[3].mtime = None
+        self.assertEqual(frames[2:3] + frames[4:6], frame_range.select(frames))
+
+    def test_mtime_offset(self):
+        """Граница со смещением от UTC сравнивается с местным временем файлов."""
+        frames = self._make_frames(10)
+        start = datetime(2024, 1, 1, 3).astimezone()
+        end = datetime(2024, 1, 1, 6).astimezone().astimezone(timezone(timedelta(hours=5)))
+        frame_range = FrameRange(start.isoformat(), end.isoformat())
+        self.assertEqual(frames[2:6], frame_range.select(frames))
+
+    def test_banners(self):
+        """Заглушки остаются только внутри отрезка."""
+        banner = Frame(None, True, 'Message')
+        frames = self._make_frames(10)
+        frames = [banner] + frames[:5] + [banner] + frames[5:] + [banner]
+        self.assertEqual(frames[3:6] + [banner] + frames[7:9],
+            FrameRange('3', '7').select(frames))
+
+
 class ConsoleInterface:
     """Интерфейс пользователя.
 
     Превращает аргументы командной строки в настройки и наборы данных. И тут также выводится
     информация в стандартный вывод по ходу анализа параметров скрипта.
     """
-    __slots__ = '_args', '_source', '_destination', '_layout'
+    __slots__ = '_args', '_source', '_destination', '_layout', '_has_warning', '_has_text'
 
     def __init__(self):
         parser = ArgumentParser(prog='catframes.py', description=DESCRIPTION,
@@ -2565,8 +5741,9 @@ class ConsoleInterface:
             help='show the resolution choosing process and exit')
 
         supported_suffixes = ' or '.join(map(lambda x: x[1:], OutputOptions.get_supported_suffixes()))
-        parser.add_argument('paths', metavar='PATH', nargs='+',
-            help='The paths are input folders (a source), ' + 
+        parser.add_argument('paths', metavar='PATH', nargs='*',
+            help='The paths are input folders or archives (zip, tar, tar.gz, ' +
+            'tar.bz2, tar.xz, tar.zst; a source), ' + 
             'and the last one is an output video file ' +
             f'({supported_suffixes}, a destination). ' + 
             'The order of the folders determines in which order ' +
@@ -2578,7 +5755,20 @@ class ConsoleInterface:
             'the script treat it as an input folder.')
 
         self._args = parser.parse_args()
-        if self._args.resolutions and \
+        if self._args.preview_scale and not self._args.preview:
+            parser.error('--preview-scale works only with --preview.')
+        if (self._args.include or self._args.exclude) and not self._args.recursive:
+            parser.error('--include and --exclude work only with --recursive.')
+        if self._args.files_from is not None:
+            if len(self._args.paths) > 1:
+                parser.error('With --files-from, only the destination path is expected.')
+            elif (not self._args.paths) and (not self._args.resolutions):
+                parser.error('A destination path is required.')
+            self._source = []
+            self._destination = self._args.paths[0] if self._args.paths else None
+        elif not self._args.paths:
+            parser.error('At least one input folder is required.')
+        elif self._args.resolutions and \
                 (
                     (len(self._args.paths) <= 1) or
                     Path(self._args.paths[-1]).expanduser().is_dir() or
@@ -2592,6 +5782,7 @@ class ConsoleInterface:
             self._source = self._args.paths[:-1]
             self._destination = self._args.paths[-1]
 
+        self._has_text = False
         self._layout = self._make_layout()
 
     @staticmethod
@@ -2617,6 +5808,51 @@ class ConsoleInterface:
             "do not exist. You are sure that you are specifying " +
             "the correct folders. If they don't exist, it just has to be " +
             "shown in the resulting video.")
+        input_arguments.add_argument('--resolution-sample', metavar='N|P%',
+            type=cls._get_sample_size_type(),
+            help='choose the resolution by a random sample of frames from each folder ' +
+            '(N frames or P percent of them); the other frames are read during rendering')
+        input_arguments.add_argument('--resolution-sample-strict', action='store_true',
+            help='stop if the frames read during rendering contradict the sample')
+        input_arguments.add_argument('--every', metavar='N',
+            type=cls._get_minmax_type(1),
+            help='take only every Nth frame (numbering is kept)')
+        input_arguments.add_argument('--duration', metavar='SECONDS',
+            type=cls._get_minmax_type(1),
+            help='take frames evenly so that the video is not longer ' +
+            'than this (numbering is kept)')
+        input_arguments.add_argument('--files-from', metavar='PATH',
+            help='read frame paths from this file ("-" for stdin) instead of listing ' +
+            'folders: one path per line or NUL-separated, in the final order; ' +
+            'a line "GROUP<TAB>PATH" puts the frame into a group for {frame:dir}, ' +
+            'otherwise frames are grouped by their folders')
+        input_arguments.add_argument('-R', '--recursive', action='store_true',
+            help='also take images from nested folders; each folder with images ' +
+            'is numbered separately, folders are sorted by their paths')
+        input_arguments.add_argument('--include', metavar='GLOB', action='append',
+            help='with --recursive, take only files matching this pattern ' +
+            '(a name or a relative path, may be repeated)')
+        input_arguments.add_argument('--exclude', metavar='GLOB', action='append',
+            help='with --recursive, skip files and folders matching this pattern ' +
+            '(a name or a relative path, may be repeated)')
+        input_arguments.add_argument('--sort', choices=('name', 'mtime', 'exif'), default='name',
+            help='the order of frames in each folder: natural by name (default), ' +
+            'by modification time or by capture time from EXIF (files are read ' +
+            'before rendering; frames without EXIF are ordered by modification time)')
+        input_arguments.add_argument('--from', metavar='BOUND', dest='range_from',
+            help='start from this frame: a number in the video, a file name ' +
+            'or a local file modification time like 2024-05-01T08:00')
+        input_arguments.add_argument('--to', metavar='BOUND', dest='range_to',
+            help='stop at this frame (inclusive), the same formats as for --from')
+
+    @staticmethod
+    def _get_sample_size_type():
+        def validator(arg):
+            try:
+                return SampleSize.parse(arg)
+            except ValueError as error:
+                raise ArgumentTypeError(str(error)) from error
+        return validator
 
     def _make_layout(self):
         h_positions = ('left', 0), ('right', 2)
@@ -2634,6 +5870,8 @@ class ConsoleInterface:
                 result.put(xpos, ypos, OverLang.compile(template))
                 if OverLang.is_warning(template):
                     has_warning = True
+                else:
+                    self._has_text = True
 
         for pos in h_positions:
             add_overlay(pos[1], middle, pos[0])
@@ -2650,6 +5888,7 @@ class ConsoleInterface:
         if not has_warning:
             print("\nBy the way: You didn't specify any WARN overlays.", flush=True)
 
+        self._has_warning = has_warning
         return result
 
     @classmethod
@@ -2704,6 +5943,45 @@ class ConsoleInterface:
             default='#000',
             help='#rrggbb or #rgb (default: %(default)s)')
 
+        rendering_arguments.add_argument('--resolution', metavar='WxH',
+            type=cls._get_resolution_type(),
+            help='use this video resolution instead of choosing it by the frames; ' +
+            'the frames are then read only during rendering')
+        rendering_arguments.add_argument('--max-pixels', metavar='X',
+            type=cls._get_minmax_type(4),
+            help='proportionally reduce the video resolution to this number of pixels')
+        rendering_arguments.add_argument('--frame-timeout', metavar='SECONDS',
+            type=cls._get_minmax_type(1),
+            help='show an error frame instead of an image that could not be read ' +
+            'in this time (a hung network mount, a pathological file)')
+        rendering_arguments.add_argument('--max-source-pixels', metavar='X',
+            type=cls._get_minmax_type(4),
+            help='do not decode more pixels of a source image: a larger JPEG is read ' +
+            'reduced by 2, 4 or 8, other formats are shown as an error frame')
+        rendering_arguments.add_argument('--max-height', metavar='X',
+            type=cls._get_minmax_type(2),
+            help='proportionally reduce the video resolution to this height')
+        rendering_arguments.add_argument('--ladder', metavar='HEIGHTS',
+            type=cls._get_heights_type(),
+            help='comma-separated heights of smaller copies of the video, e.g. 1080,720,480; ' +
+            'the images are read once, the overlays are drawn at each size, the copies ' +
+            'are saved next to the destination as NAME_720p.mp4 and so on; heights that ' +
+            'are not smaller than the video are skipped')
+        rendering_arguments.add_argument('--engine', choices=('pillow', 'ffmpeg'),
+            default='pillow',
+            help='let FFmpeg read, scale and label the frames itself when it can: only ' +
+            'JPEG files, no archives, no WARN overlays (--top=""); otherwise Pillow ' +
+            'is used (default: %(default)s)')
+
+    @staticmethod
+    def _get_resolution_type():
+        def validator(arg):
+            try:
+                return ResolutionUtils.parse(arg)
+            except ValueError as error:
+                raise ArgumentTypeError(str(error)) from error
+        return validator
+
     @classmethod
     def _add_output_arguments(cls, parser: ArgumentParser):
         quality_choices = 'poor', 'medium', 'high'
@@ -2716,12 +5994,72 @@ class ConsoleInterface:
         video_arguments.add_argument('-q', '--quality', metavar='X',
             choices=quality_choices, default=default_quality,
             help='%(choices)s (default: %(default)s)')
+        video_arguments.add_argument('--also', metavar='PATH[@X]', action='append', default=[],
+            help='one more mp4 or webm video from the same frames, optionally with its own ' +
+            f'quality ({", ".join(quality_choices)}); the frames are rendered once; ' +
+            'may be repeated')
         video_arguments.add_argument('--limit', metavar='SECONDS',
             type=cls._get_minmax_type(1),
             help='to try different options')
+        video_arguments.add_argument('--preview', action='store_true',
+            help='make a quick draft: --preview-scale of the resolution, ' +
+            'frames evenly taken from the whole sequence ' +
+            f'(--limit or {OutputOptions.DRAFT_SECONDS} seconds), the fastest compression')
+        video_arguments.add_argument('--preview-scale', metavar='SCALE',
+            type=cls._get_scale_type(),
+            help='with --preview, a number in range (0, 1] ' +
+            f'(default: {OutputOptions.DRAFT_SCALE})')
+        video_arguments.add_argument('--codec', choices=tuple(OutputOptions.CODEC_SUFFIXES),
+            default='auto',
+            help='auto: H.264 for mp4, VP9 for webm; also HEVC (mp4, mkv), AV1 (mp4, webm, ' +
+            'mkv), lossless FFV1 (mkv, avi); mjpeg-copy: put JPEG files into mkv or avi ' +
+            'as they are, compress the other frames to JPEG (default: %(default)s)')
+        video_arguments.add_argument('--profile', metavar='NAME',
+            default=EncoderProfiles.DEFAULT,
+            help=f'encoder settings: {", ".join(EncoderProfiles.PROFILES)} or a profile ' +
+            'from --profile-file (default: %(default)s)')
+        video_arguments.add_argument('--profile-file', metavar='PATH',
+            help='a JSON file that adds or overrides encoder profiles: ' +
+            '{"profile": {"encoder": {"-option": value, "crf_offset": N}}}')
+        video_arguments.add_argument('--auto-preset', action='store_true',
+            help='try the encoder presets on a few frames and take the slowest one ' +
+            'that keeps up with rendering; the choice is cached for this machine, quality ' +
+            'and resolution; not with --also and --ladder')
+        video_arguments.add_argument('--yuv', action='store_true',
+            help='convert frames to the pixel format of the quality before passing them ' +
+            'to FFmpeg: less data to pass, no conversion in FFmpeg (with --also, ' +
+            'the format of the highest quality)')
         video_arguments.add_argument('-f', '--force', action='store_true',
             help='overwrite video file if exists')
 
+    @staticmethod
+    def _get_heights_type():
+        def validator(arg):
+            try:
+                values = [int(x) for x in arg.split(',')]
+            except ValueError as error:
+                raise ArgumentTypeError(f'Heights must be integers, not "{arg}".') from error
+
+            if any(x < 2 for x in values):
+                raise ArgumentTypeError('Heights must be at least 2.')
+
+            return sorted(set(values), reverse=True)
+        return validator
+
+    @staticmethod
+    def _get_scale_type():
+        def validator(arg):
+            try:
+                value = float(arg)
+            except ValueError as error:
+                raise ArgumentTypeError(f'It must be a number, not "{arg}".') from error
+
+            if not (0 < value <= 1):
+                raise ArgumentTypeError('It must be in range (0, 1].')
+
+            return value
+        return validator
+
     @classmethod
     def _add_system_arguments(cls, parser: ArgumentParser):
         system_arguments = parser.add_argument_group('System')
@@ -2731,6 +6069,10 @@ class ConsoleInterface:
 
         system_arguments.add_argument('--live-preview', action='store_true',
             help='print base64 encoded JPEG thumbnails')
+        system_arguments.add_argument('--transport', choices=OutputOptions.TRANSPORTS,
+            default=OutputOptions.TRANSPORTS[0],
+            help='pass frames to FFmpeg via its stdin or a named pipe (POSIX only); ' +
+            'on Linux the pipe buffer is enlarged (default: %(default)s)')
 
     def show_options(self):
         """Чтобы пользователь видел, как проинтерпретированы его аргументы."""
@@ -2746,9 +6088,10 @@ class ConsoleInterface:
             elif value:
                 print(f'  {key}: {value}', flush=True)
 
-        print(f'  source:', flush=True)
-        for item in self._source:
-            print(f'    - {item}', flush=True)
+        if self._source:
+            print(f'  source:', flush=True)
+            for item in self._source:
+                print(f'    - {item}', flush=True)
         if None != self._destination:
             print(f'  destination:', flush=True)
             print(f'    - {self._destination}', flush=True)
@@ -2758,12 +6101,130 @@ class ConsoleInterface:
         """Визуально отделить всё, что было выведено в консоль выше."""
         print(f"{'-'*42}\n", flush=True)
 
+    @staticmethod
+    def _sort_frames(frames: List[Frame], order: str):
+        """Пересортировывает на месте кадры одной папки, уже отсортированные по имени.
+        Сортировка устойчивая, так что кадры с одинаковым временем остаются в порядке имён,
+        а кадры без времени оказываются в конце.
+
+        Для сортировки по EXIF кадры изучаются (см. :meth:`Frame.probe`): это тот же единственный
+        проход по файлу, что и при выборе разрешения.
+        """
+        if order == 'name':
+            return
+
+        if order == 'exif':
+            Frame.probe_all(frames)
+
+        def get_key(frame: Frame):
+            time = (frame.exif_time or frame.mtime) if order == 'exif' else frame.mtime
+            return (time is None, time or datetime.min)
+
+        frames.sort(key=get_key)
+
+    def _list_folder(self, folder_path: Path, with_mtime: bool) -> List[List[Frame]]:
+        """Кадры папки, отсортированные по имени. С --recursive каждая вложенная папка
+        с изображениями становится отдельной группой для {frame:dir}.
+
+        :raises ValueError: папка недоступна на просмотр (подробности в сообщении).
+        :raises OSError: что-то, что не было предусмотрено.
+        """
+        if self._args.recursive:
+            images_by_path = dict(FileUtils.walk_images(folder_path,
+                self._args.include or (), self._args.exclude or ()))
+            relative_paths = list(images_by_path)
+            FileUtils.sort_natural(relative_paths, by_parts=True)
+            image_groups = [images_by_path[x] for x in relative_paths]
+        else:
+            image_groups = [FileUtils.scan_images(folder_path)]
+
+        frame_groups = []
+        for images in image_groups:
+            FileUtils.sort_natural(images)
+            group = []
+            for entry in images:
+                frame = Frame(Path(entry.path), probe=False)
+                frame.inode = FileUtils.get_entry_inode(entry)
+                if with_mtime:
+                    frame.mtime = FileUtils.get_entry_mtime(entry)
+                group.append(frame)
+            frame_groups.append(group)
+        return frame_groups
+
+    def _list_archive(self, archive_path: Path, with_mtime: bool) -> List[List[Frame]]:
+        """Кадры архива, читаемые без распаковки. Каждая папка внутри архива — отдельная
+        группа, как с --recursive.
+
+        :raises ValueError: архив не читается (подробности в сообщении).
+        """
+        source = FrameSource.create(archive_path)
+        names: Dict[PurePosixPath, str] = {}
+        paths_by_folder: Dict[PurePosixPath, List[PurePosixPath]] = {}
+        for name in source.list_images():
+            member_path = PurePosixPath(name)
+            names[member_path] = name
+            paths_by_folder.setdefault(member_path.parent, []).append(member_path)
+
+        folders = list(paths_by_folder)
+        FileUtils.sort_natural(folders, by_parts=True)
+
+        frame_groups = []
+        for folder in folders:
+            member_paths = paths_by_folder[folder]
+            FileUtils.sort_natural(member_paths)
+            group = []
+            for member_path in member_paths:
+                name = names[member_path]
+                frame = Frame(archive_path / member_path, probe=False, source=source, member=name)
+                if with_mtime:
+                    frame.mtime = source.get_mtime(name)
+                group.append(frame)
+            frame_groups.append(group)
+        return frame_groups
+
+    def _read_file_list(self, with_mtime: bool) -> List[List[Frame]]:
+        """Кадры из списка --files-from в том порядке, в котором они перечислены. Папки
+        не просматриваются, имена не сортируются.
+
+        :raises ValueError: список не удалось прочитать.
+        """
+        frame_groups: List[List[Frame]] = []
+
+        def consume(binary: BinaryIO):
+            previous_key = None
+            for group, path in FileUtils.read_file_list(binary):
+                key = group if group is not None else str(path.parent)
+                if (not frame_groups) or (key != previous_key):
+                    frame_groups.append([])
+                    previous_key = key
+                frame = Frame(path, probe=False)
+                if with_mtime:
+                    frame.mtime = FileUtils.get_mtime(path)
+                frame_groups[-1].append(frame)
+
+        try:
+            if self._args.files_from == '-':
+                consume(sys.stdin.buffer)
+            else:
+                with Path(self._args.files_from).expanduser().open('rb') as binary:
+                    consume(binary)
+        except OSError as error:
+            raise ValueError(f'Cannot read the file list: {error}') from error
+
+        for frames in frame_groups:
+            self._sort_frames(frames, self._args.sort)
+
+        return frame_groups
+
     def get_input_sequence(self) -> Sequence[Frame]:
-        """Возвращает отсортированную и пронумерованную последовательность кадров.
+        """Возвращает отсортированную и пронумерованную последовательность кадров. Сами файлы
+        ещё не прочитаны (см. :meth:`Frame.probe`).
 
         :raises ValueError: не удалось прочитать список файлов или в указанных директориях нет
             ни одного изображения.
         """
+        frame_range = FrameRange(self._args.range_from, self._args.range_to)
+
         print('Scanning for files...', flush=True)
         frame_groups = []
 
@@ -2773,34 +6234,74 @@ class ConsoleInterface:
             banner = Frame(None, True, message)
             return [banner for i in range(banner_duration_seconds * self._args.frame_rate)]
 
-        for raw_folder_path in self._source:
-            folder_path = Path(raw_folder_path)
-            real_images: Union[List[Path], None] = None
+        with_mtime = frame_range.needs_mtime or (self._args.sort != 'name')
+
+        if self._args.files_from is not None:
+            frame_groups.extend(self._read_file_list(with_mtime))
+
+        def list_source(folder_path: Path) -> List[List[Frame]]:
+            if FrameSource.is_archive(folder_path) and not folder_path.expanduser().is_dir():
+                return self._list_archive(folder_path, with_mtime)
+            return self._list_folder(folder_path, with_mtime)
+
+        # Папки просматриваются одновременно: на сетевых дисках это в основном ожидание.
+        # Результаты и ошибки разбираются по порядку.
+        with ThreadPoolExecutor() as executor:
+            listings = [
+                (Path(x), executor.submit(list_source, Path(x)))
+                for x in self._source
+            ]
+
+        for folder_path, listing in listings:
+            groups: Union[List[List[Frame]], None] = None
             try:
-                real_images = FileUtils.list_images(folder_path)
+                groups = listing.result()
             except (ValueError, OSError) as e:
                 if self._args.sure:
                     frame_groups.append(get_banner_frames(f'{type(e).__name__}: {str(e)}'))
                 else:
                     raise
 
-            if real_images is None:
+            if groups is None:
                 # Либо мы выбросили исключение ранее,
                 # либо кадры-заглушки уже добавлены.
                 pass
-            elif (len(real_images) < 1) and self._args.sure:
+            elif (not any(groups)) and self._args.sure:
                 frame_groups.append(get_banner_frames(f'Could not find images in {folder_path}'))
             else:
-                FileUtils.sort_natural(real_images)
-                frame_groups.append([Frame(image) for image in real_images])
+                for group in groups:
+                    self._sort_frames(group, self._args.sort)
+                    frame_groups.append(group)
 
         print('Numbering frames...', flush=True)
         Enumerator.enumerate(frame_groups)
 
-        frames = functools.reduce(lambda x, y: x+y, frame_groups)
+        frames = list(itertools.chain.from_iterable(frame_groups))
 
         print(f'\nThere are {Enumerator.count(frames)} frames...', flush=True)
 
+        if frame_range:
+            frames = frame_range.select(frames)
+            if not Enumerator.count(frames):
+                raise ValueError('Error: there are no frames in the specified range.')
+            print(f'In range: {Enumerator.count(frames)}', flush=True)
+
+        # Прореживание после нумерации, но до чтения файлов.
+        if self._args.every:
+            frames = Decimator.every(frames, self._args.every)
+        if self._args.duration:
+            banner_count = len(frames) - Enumerator.count(frames)
+            count = max(1, self._args.duration * self._args.frame_rate - banner_count)
+            frames = Decimator.evenly(frames, count)
+        if self._args.preview:
+            # Черновик не читает файлы, которые в него не попадут (см. OutputOptions.limit_frames).
+            seconds = self._args.limit or OutputOptions.DRAFT_SECONDS
+            banner_count = len(frames) - Enumerator.count(frames)
+            count = max(1, seconds * self._args.frame_rate - banner_count)
+            frames = Decimator.evenly(frames, count)
+        if self._args.every or self._args.duration or self._args.preview:
+            print(f'Taken: {Enumerator.count(frames)}', flush=True)
+
         # Имеется ввиду, что совсем никаких кадров нет, даже кадров-заглушек.
         # Если не только несуществующие, но и пустые папки будут приводить
         # к добавлению кадров-заглушек, это невозможная ситуация.
@@ -2827,26 +6328,89 @@ class ConsoleInterface:
         if destination.is_symlink():
             raise ValueError('Destination must not be a symbolic link.')
 
-        if destination.suffix not in OutputOptions.get_supported_suffixes():
+        if destination.suffix not in OutputOptions.CODEC_SUFFIXES[self._args.codec]:
             expected = ', '.join(
-                map(lambda x: x[1:], OutputOptions.get_supported_suffixes())
+                map(lambda x: x[1:], OutputOptions.CODEC_SUFFIXES[self._args.codec])
             )
             raise ValueError(f'Unsupported destination file extension.\nExpected: {expected}.')
 
-        if self._args.quality == 'high':
-            quality = Quality.HIGH
-        elif self._args.quality == 'poor':
-            quality = Quality.POOR
-        else:
-            quality = Quality.MEDIUM
+        quality = self._get_quality(self._args.quality)
+
+        if self._args.auto_preset and (self._args.also or self._args.ladder):
+            raise ValueError('--auto-preset measures one encoder, ' +
+                'it does not work with --also and --ladder.')
+
+        if self._args.also and ('mjpeg-copy' == self._args.codec):
+            raise ValueError('--also compresses rendered frames, it does not work with mjpeg-copy.')
+
+        if self._args.ladder and ('mjpeg-copy' == self._args.codec):
+            raise ValueError('The ladder needs rendered frames, it does not work with mjpeg-copy.')
+
+        if ('fifo' == self._args.transport) and not hasattr(os, 'mkfifo'):
+            raise ValueError('Named pipes are not supported on this system.')
+
+        profiles = EncoderProfiles()
+        if self._args.profile_file:
+            profiles.load(Path(self._args.profile_file))
+        if self._args.profile not in profiles.names:
+            raise ValueError(f'Unknown encoder profile: {self._args.profile}.\n' +
+                f'Expected: {", ".join(profiles.names)}.')
 
         return OutputOptions(
             destination=destination,
             overwrite=bool(self._args.force),
             limit_seconds=self._args.limit,
             live_preview=self._args.live_preview,
+            draft=bool(self._args.preview),
             quality=quality,
-            frame_rate=self._args.frame_rate)
+            frame_rate=self._args.frame_rate,
+            transport=self._args.transport,
+            codec=self._args.codec,
+            profile=self._args.profile,
+            profiles=profiles)
+
+    def get_resolution_sampler(self, frames: Sequence[Frame]) -> Optional[ResolutionSampler]:
+        """Возвращает выборку кадров, если пользователь не хочет ждать изучения всех файлов."""
+        if not self._args.resolution_sample:
+            return None
+        print('Probing a sample of frames...', flush=True)
+        return ResolutionSampler(frames, self._args.resolution_sample,
+            strict=self._args.resolution_sample_strict)
+
+    @property
+    def resolution(self) -> Optional[Resolution]:
+        """Разрешение, заданное пользователем явно."""
+        return self._args.resolution
+
+    def limit_resolution(self, resolution: Resolution) -> Resolution:
+        """Уменьшает разрешение до заданных пользователем пределов, а также для черновика."""
+        result = ResolutionUtils.limit(resolution,
+            max_pixels=self._args.max_pixels,
+            max_height=self._args.max_height)
+        if self._args.preview:
+            result = ResolutionUtils.scale(result,
+                self._args.preview_scale or OutputOptions.DRAFT_SCALE)
+        return result
+
+    @property
+    def draft(self) -> bool:
+        """Пользователь хочет быстро получить черновик видео."""
+        return bool(self._args.preview)
+
+    @property
+    def yuv(self) -> bool:
+        """Рисовать кадры сразу в формате пикселей видео."""
+        return bool(self._args.yuv)
+
+    @property
+    def frame_timeout(self) -> Optional[int]:
+        """Сколько секунд можно ждать одну исходную картинку."""
+        return self._args.frame_timeout
+
+    @property
+    def max_source_pixels(self) -> Optional[int]:
+        """Ограничение на размер декодируемых исходных картинок."""
+        return self._args.max_source_pixels
 
     @property
     def statistics_only(self) -> bool:
@@ -2863,6 +6427,110 @@ class ConsoleInterface:
         """План наложения оверлеев."""
         return self._layout
 
+    @property
+    def has_warning(self) -> bool:
+        """Есть ли в плане оверлей с предупреждениями (``WARN``)."""
+        return self._has_warning
+
+    @property
+    def has_text(self) -> bool:
+        """Есть ли в плане оверлеи, кроме предупреждений."""
+        return self._has_text
+
+    @property
+    def engine(self) -> str:
+        """Кто рисует кадры: ``pillow`` или, если получится, ``ffmpeg``."""
+        return self._args.engine
+
+    @staticmethod
+    def _get_quality(name: str) -> Quality:
+        if 'high' == name:
+            return Quality.HIGH
+        elif 'poor' == name:
+            return Quality.POOR
+        return Quality.MEDIUM
+
+    def get_also_output_options(self, output_options: OutputOptions) -> List[OutputOptions]:
+        """Настройки дополнительных видео (``--also``): всё, кроме файла и качества, как
+        у основного. Кодек выбирается по расширению.
+
+        :raises ValueError: недопустимый файл или качество.
+        """
+        result: List[OutputOptions] = []
+        for argument in self._args.also:
+            path_string, _, quality_name = argument.rpartition('@')
+            if (not path_string) or (quality_name not in ('poor', 'medium', 'high')):
+                path_string, quality_name = argument, ''
+            destination = Path(path_string)
+
+            if destination.is_dir() or destination.is_symlink():
+                raise ValueError(f'Not a file: {destination}')
+            if destination.suffix not in OutputOptions.CODEC_SUFFIXES['auto']:
+                expected = ', '.join(x[1:] for x in OutputOptions.CODEC_SUFFIXES['auto'])
+                raise ValueError(f'Unsupported file extension: {destination}\n' +
+                    f'Expected: {expected}.')
+            self._check_unique(destination, [output_options, *result])
+
+            result.append(replace(output_options, destination=destination, codec='auto',
+                quality=(self._get_quality(quality_name) if quality_name
+                    else output_options.quality)))
+        return result
+
+    @staticmethod
+    def _check_unique(destination: Path, others: Iterable[OutputOptions]):
+        """:raises ValueError: в этот файл уже пишет другое видео."""
+        if any(x.destination.resolve() == destination.resolve() for x in others):
+            raise ValueError(f'The same file twice: {destination}')
+
+    def get_ladder(self, resolution: Resolution) -> List[Resolution]:
+        """Разрешения ступеней ``--ladder`` меньше ``resolution``, с той же пропорцией.
+        О пропущенных высотах выводится предупреждение.
+        """
+        heights = self._args.ladder or []
+        skipped = [x for x in heights if x >= resolution.height]
+        if skipped:
+            print(f'Warning: --ladder {",".join(map(str, skipped))} skipped, ' +
+                f'the video itself is {resolution}.\n', flush=True)
+        return [
+            Resolution(ResolutionUtils.round(resolution.width * x / resolution.height),
+                ResolutionUtils.round(x))
+            for x in heights if x < resolution.height
+        ]
+
+    @classmethod
+    def get_ladder_output_options(cls, output_options: OutputOptions,
+            areas: Sequence[Tuple[int, int, int, int]],
+            also_output_options: Sequence[OutputOptions] = ()) -> List[OutputOptions]:
+        """Видео ступеней ``--ladder`` рядом с основным: ``NAME_720p.mp4`` и т.д.
+
+        :raises ValueError: файл уже есть или в него пишет другое видео.
+        """
+        result: List[OutputOptions] = []
+        destination = output_options.destination
+        for area in areas:
+            rung = destination.with_name(f'{destination.stem}_{area[1]}p{destination.suffix}')
+            if (not output_options.overwrite) and rung.exists():
+                raise ValueError(f'File already exists: {rung}')
+            cls._check_unique(rung, [output_options, *also_output_options, *result])
+            result.append(replace(output_options, destination=rung, area=area))
+        return result
+
+    @property
+    def auto_preset(self) -> bool:
+        return self._args.auto_preset
+
+    @staticmethod
+    def get_preset_cache_path() -> Path:
+        """Файл с пресетами, которые выбрал ``--auto-preset``, в папке кэша пользователя."""
+        system = platform.system()
+        if ('Windows' == system) and os.environ.get('LOCALAPPDATA'):
+            folder = Path(os.environ['LOCALAPPDATA'])
+        elif 'Darwin' == system:
+            folder = Path.home() / 'Library' / 'Caches'
+        else:
+            folder = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache')
+        return folder / 'catframes' / 'presets.json'
+
     @staticmethod
     def list_resolutions(resolutions: ResolutionStatistics, limit:int = 10):
         """Перечислить разрешения от самых частых к самым редким."""
@@ -2877,6 +6545,74 @@ class ConsoleInterface:
             print('...', flush=True)
 
 
+class _ConsoleInterfaceTest(TestCase):
+    def _parse(self, *arguments: str) -> ConsoleInterface:
+        self.addCleanup(setattr, sys, 'argv', sys.argv)
+        sys.argv = ['catframes.py', *arguments]
+        return ConsoleInterface()
+
+    def test_also(self):
+        """У дополнительного видео может быть своё качество, но не тот же файл."""
+        cli = self._parse('--also', 'a.webm@poor', '--also=b@c.mp4', '--also', 'c.webm@x',
+            'folder', 'video.mp4')
+        with self.assertRaises(ValueError):
+            cli.get_also_output_options(cli.get_output_options())  # c.webm@x
+
+        cli = self._parse('-q', 'high', '--also', 'a.webm@poor', '--also=b@c.mp4',
+            'folder', 'video.mp4')
+        output_options = cli.get_output_options()
+        also = cli.get_also_output_options(output_options)
+        self.assertEqual([Path('a.webm'), Path('b@c.mp4')], [x.destination for x in also])
+        self.assertEqual([Quality.POOR, Quality.HIGH], [x.quality for x in also])
+        self.assertEqual(['vp9', 'h264'], [x.get_codec() for x in also])
+
+        for destination in 'video.mp4', './a.webm':
+            cli = self._parse('--also', 'a.webm', '--also', destination, 'folder', 'video.mp4')
+            with self.assertRaises(ValueError):
+                cli.get_also_output_options(cli.get_output_options())
+
+    def test_also_mjpeg_copy(self):
+        """Скопированные JPEG нельзя сжать ещё раз тем же FFmpeg."""
+        cli = self._parse('--codec=mjpeg-copy', '--also', 'a.mp4', 'folder', 'video.mkv')
+        with self.assertRaises(ValueError):
+            cli.get_output_options()
+
+    def test_preview(self):
+        """--preview не забирает следующий аргумент, масштаб задаётся отдельно."""
+        cli = self._parse('--preview', 'folder', 'video.mp4')
+        self.assertTrue(cli.draft)
+        self.assertEqual(Resolution(480, 270), cli.limit_resolution(Resolution(1920, 1080)))
+
+        cli = self._parse('--preview', '--preview-scale=0.5', 'folder', 'video.mp4')
+        self.assertEqual(Resolution(960, 540), cli.limit_resolution(Resolution(1920, 1080)))
+
+        for arguments in ('--preview-scale=0.5',), ('--preview', '--preview-scale=x'):
+            with contextlib.redirect_stderr(io.StringIO()) as output, \
+                    self.assertRaises(SystemExit):
+                self._parse(*arguments, 'folder', 'video.mp4')
+            self.assertIn('--preview-scale', output.getvalue())
+
+    def test_ladder(self):
+        """Ступени меньше видео сохраняются рядом с ним, каждая в своей части холста."""
+        cli = self._parse('--ladder', '480,2160,720', '--also', 'out/video_720p.mp4',
+            'folder', 'out/video.mp4')
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            ladder = cli.get_ladder(Resolution(1920, 1080))
+        self.assertIn('2160', output.getvalue())
+        self.assertEqual([Resolution(1280, 720), Resolution(852, 480)], ladder)
+
+        output_options = cli.get_output_options()
+        areas = [(1280, 720, 0, 1080), (852, 480, 0, 1800)]
+        rungs = cli.get_ladder_output_options(output_options, areas)
+        self.assertEqual([Path('out/video_720p.mp4'), Path('out/video_480p.mp4')],
+            [x.destination for x in rungs])
+        self.assertEqual(areas, [x.area for x in rungs])
+
+        with self.assertRaises(ValueError):
+            cli.get_ladder_output_options(output_options, areas,
+                cli.get_also_output_options(output_options))
+
+
 def seek_signals():
     """The only reason this function exists is because of the broken signals in Windows."""
     buffer = deque(maxlen = 10)
@@ -2908,6 +6644,10 @@ def main():
             raise ValueError('FFmpeg not found.')
 
         cli = ConsoleInterface()
+        if cli.max_source_pixels:
+            # Своё ограничение вместо защиты Pillow: заголовки больших картинок читаются,
+            # а их пиксели декодируются только в уменьшенном виде.
+            Image.MAX_IMAGE_PIXELS = None
         cli.show_options()
         cli.show_splitter()
         print(f'The number of overlays: {len(cli.layout)}\n', flush=True)
@@ -2917,29 +6657,93 @@ def main():
             output_options = cli.get_output_options()
             if (not output_options.overwrite) and output_options.destination.exists():
                 raise ValueError('Destination file already exists.')
+            also_output_options = cli.get_also_output_options(output_options)
+            for options in also_output_options:
+                if (not options.overwrite) and options.destination.exists():
+                    raise ValueError(f'File already exists: {options.destination}')
         else:
             output_options = None
+            also_output_options = []
 
         frames = cli.get_input_sequence()
 
-        resolution_table = ResolutionStatistics(frames)
-        cli.list_resolutions(resolution_table)
+        on_frame: Optional[Callable[[Frame], None]] = None
+        sampler = None
 
-        resolution = resolution_table.choose()
-        print(f'\nDecision: {resolution}\n', flush=True)
+        if cli.resolution and not cli.statistics_only:
+            # Кадры будут прочитаны по ходу рендеринга.
+            resolution = cli.resolution
+            on_frame = Frame.probe
+            print(f'Resolution: {resolution}\n', flush=True)
+        else:
+            sampler = cli.get_resolution_sampler(frames)
+            if sampler:
+                resolution_table = sampler.statistics
+                on_frame = sampler.check
+            else:
+                print('Probing frames...', flush=True)
+                Frame.probe_all(frames)
+                resolution_table = ResolutionStatistics(frames)
+
+            cli.list_resolutions(resolution_table)
+
+            resolution = cli.resolution or resolution_table.choose()
+            print(f'\nDecision: {resolution}\n', flush=True)
+
+            if sampler:
+                sampler.show()
+                print(flush=True)
+
+            del resolution_table
+
+        limited_resolution = cli.limit_resolution(resolution)
+        if limited_resolution != resolution:
+            resolution = limited_resolution
+            print(f'Limited to {resolution}\n', flush=True)
 
         if cli.statistics_only:
             sys.exit(0)
 
         cli.show_splitter()
-        del resolution_table
 
         processing_start = monotonic()
 
-        view: DefaultFrameView = DefaultFrameView(resolution, cli.margin_color, cli.layout)
+        pix_fmt = 'rgb24'
+        if cli.yuv:
+            # Одни и те же кадры идут во все видео, так что цветность не должна теряться.
+            pix_fmt = PillowFrameView.get_richest_pix_fmt(x.quality.get_pix_fmt()
+                for x in [output_options, *also_output_options])
+
+        def make_view(resolution: Resolution) -> DefaultFrameView:
+            return DefaultFrameView(resolution, cli.margin_color, cli.layout,
+                draft=cli.draft, max_source_pixels=cli.max_source_pixels,
+                frame_timeout=cli.frame_timeout, pix_fmt=pix_fmt)
+
+        view = make_view(resolution)
         frames = output_options.limit_frames(frames)
 
-        output_processor = OutputProcessor(output_options)
+        if on_frame and cli.frame_timeout:
+            # Ленивое изучение кадров тоже читает файлы, и тоже не дольше frame_timeout.
+            account_frame = sampler.account if sampler else None
+
+            def on_frame_in_time(frame: Frame):
+                view.probe_in_time(frame)
+                if account_frame:
+                    account_frame(frame)
+
+            on_frame = on_frame_in_time
+
+        renderer: Union[PillowFrameView, FilterGraph, JpegCopyView] = view
+        ladder = cli.get_ladder(resolution)
+        if ladder:
+            print(f'Ladder: {", ".join(map(str, ladder))}\n', flush=True)
+            renderer = LadderFrameView([view, *map(make_view, ladder)], view.pix_fmt)
+            areas = renderer.get_areas()
+            output_options = replace(output_options, area=areas[0])
+            also_output_options = [replace(x, area=areas[0]) for x in also_output_options] + \
+                cli.get_ladder_output_options(output_options, areas[1:], also_output_options)
+
+        output_processor = OutputProcessor(output_options, also_output_options)
 
         def on_interrupt(sig, frame):
             os.write(sys.stdout.fileno(), b'Keyboard interrupt!\n')
@@ -2958,7 +6762,37 @@ def main():
         if 'Windows' == platform.system():
             signal.signal(signal.SIGBREAK, on_ctrl_break)
 
-        output_processor.make(view, frames)
+        if 'mjpeg-copy' == output_options.codec:
+            if cli.has_text:
+                print('Overlays are drawn, so every frame is compressed again\n', flush=True)
+            renderer = JpegCopyView(view, frames, output_options.quality, copy=not cli.has_text)
+        elif 'ffmpeg' == cli.engine:
+            try:
+                if cli.has_warning:
+                    raise ValueError('WARN overlays need checksums')
+                if sampler:
+                    raise ValueError('the resolution sample must be checked')
+                if ladder:
+                    raise ValueError('the ladder is drawn by Pillow')
+                renderer = FilterGraph(view, frames, output_options.frame_rate)
+                print('Rendering with FFmpeg\n', flush=True)
+            except ValueError as reason:
+                print(f'Rendering with Pillow: {reason}\n', flush=True)
+
+        if cli.auto_preset:
+            if isinstance(renderer, PillowFrameView):
+                output_processor.calibrate_preset(renderer, frames, cli.get_preset_cache_path())
+            else:
+                print('The preset is not calibrated: frames are not rendered by Pillow\n',
+                    flush=True)
+
+        output_processor.make(renderer, frames, on_frame=on_frame)
+
+        if isinstance(renderer, JpegCopyView):
+            print(f'Copied {renderer.copied_count} of {len(frames)} frames.', flush=True)
+
+        if sampler:
+            sampler.show_summary()
 
         print(f'\nFinished in {int(monotonic() - processing_start)} seconds.', flush=True)
 